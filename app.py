@@ -1,37 +1,52 @@
 from datetime import datetime, timedelta
+import csv
 import hashlib
-from flask import Flask, render_template, request, redirect, url_for, session
-from db import get_db_connection
+import io
+import time
+import mysql.connector
+from flask import Flask, Response, render_template, request, redirect, url_for, session
+from db import db_connection, PoolTimeoutError
+from cache import get_airports, get_airlines, search_cache
+from seats import seat_inventory, with_availability, SEAT_LETTERS
+from seat_events import seat_broker, MAX_STREAM_FLIGHTS, SEAT_STREAMS
+from itinerary import itinerary_cache
+from booking import book_seat, book_seats, contention, SeatTakenError
+from route_graph import route_graph, find_connections, MAX_STOPS
+from sales import sales_report
+from paging import page_size, decode_cursor, seek_clause, seek_params, paginate
+from export import stream_rows, EXPORT_FORMATS
+from conditional import json_response
+from schedule_import import import_schedule, load_reference, FLIGHT_CSV_COLUMNS
+import schedules
+from fleet import import_fleet, fleet_page, FLEET_PAGE_SIZE, AIRPLANE_CSV_COLUMNS
+import sqltrace
+import metrics
+from ratings import (record_rating, rating_summary, reviews_page,
+                     REVIEWS_PAGE_SIZE, MAX_REVIEWS_PAGE_SIZE, STARS)
 
 app = Flask(__name__)
 app.secret_key = 'murun123'
-
-#seat NUMBERS
-SEAT_LETTERS = "ABCDEF"   # 6 seats per row: A–F
-
-def generate_seat_labels(num_seats, per_row=6):
-    """Return list like ['1A','1B',...,'30F'] for given num_seats."""
-    seats = []
-    for i in range(num_seats):
-        row = i // per_row + 1
-        col = SEAT_LETTERS[i % per_row]
-        seats.append(f"{row}{col}")
-    return seats
+sqltrace.init_app(app)
+metrics.init_app(app)
 
 #general home page
 @app.route("/")
 def index():
-    conn = get_db_connection()
-    if conn is None:
-        return "Database connection error.", 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT airport_code, city FROM Airport")
-    airports = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
+    airports = get_airports()
     return render_template("home.html", airports=airports)
 
+#database unreachable or failing
+@app.errorhandler(mysql.connector.Error)
+def database_error(err):
+    app.logger.error("Database error: %s", err)
+    return "Database connection error.", 500
+
+#every pooled connection busy: overloaded rather than broken, so try again
+@app.errorhandler(PoolTimeoutError)
+def pool_timeout(err):
+    app.logger.warning("Database pool exhausted: %s", err)
+    return "The site is busy. Please try again in a moment.", 503, {"Retry-After": "5"}
+
 #login protection
 def login_required(role=None):
     def decorator(func):
@@ -75,12 +90,11 @@ def customer_login():
         password_input = request.form["password"]
         hashed = hashlib.md5(password_input.encode()).hexdigest()
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Customer WHERE email=%s AND password=%s", (email, hashed))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM Customer WHERE email=%s AND password=%s", (email, hashed))
+            user = cursor.fetchone()
+            cursor.close()
 
         if user:
             session["username"] = user["email"]
@@ -130,42 +144,42 @@ def customer_register():
 
         hashed_password = hashlib.md5(password.encode()).hexdigest()
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        # Check duplicate email
-        cursor.execute("SELECT * FROM Customer WHERE email=%s", (email,))
-        existing = cursor.fetchone()
-        if existing:
-            return render_template(
-                "customer_register.html",
-                error="Email already registered."
-            )
+            # Check duplicate email
+            cursor.execute("SELECT * FROM Customer WHERE email=%s", (email,))
+            existing = cursor.fetchone()
+            if existing:
+                cursor.close()
+                return render_template(
+                    "customer_register.html",
+                    error="Email already registered."
+                )
 
-        # Insert all fields
-        cursor.execute("""
-            INSERT INTO Customer
-            (email, name, password,
-             building_number, street, city, state,
-             phone_number,
-             passport_number, passport_expiration, passport_country,
-             date_of_birth)
-            VALUES (%s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s,
-                    %s, %s, %s,
-                    %s)
-        """, (
-            email, name, hashed_password,
-            building_number, street, city, state,
-            phone_number,
-            passport_number, passport_expiration, passport_country,
-            date_of_birth
-        ))
-
-        conn.commit()
-        cursor.close()
-        conn.close()
+            # Insert all fields
+            cursor.execute("""
+                INSERT INTO Customer
+                (email, name, password,
+                 building_number, street, city, state,
+                 phone_number,
+                 passport_number, passport_expiration, passport_country,
+                 date_of_birth)
+                VALUES (%s, %s, %s,
+                        %s, %s, %s, %s,
+                        %s,
+                        %s, %s, %s,
+                        %s)
+            """, (
+                email, name, hashed_password,
+                building_number, street, city, state,
+                phone_number,
+                passport_number, passport_expiration, passport_country,
+                date_of_birth
+            ))
+
+            conn.commit()
+            cursor.close()
 
         # Auto-login
         session["username"] = email
@@ -184,136 +198,184 @@ def customer_home():
 #flight search
 @app.route("/search")
 def search():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT airport_code, city FROM Airport")
-    airports = cursor.fetchall()
+    airports = get_airports()
+    return render_template("search.html", airports=airports)
 
-    cursor.close()
-    conn.close()
+MAX_FLEX_DAYS = 7
+SEARCH_MAX_AGE = 10   # seconds clients and proxies may reuse /api/search without asking
 
-    return render_template("search.html", airports=airports)
+#flights for a route over a window of days, cached per day until a flight on it changes
+def find_flights_window(source, destination, first_day, num_days, now):
+    """Return {day string: flights} for num_days days starting at first_day.
 
-#flight search result
-@app.route("/search_result", methods=["GET", "POST"])
-def search_result():
-    if request.method == "POST":
-        trip_type = request.form.get("trip_type", "oneway")
-        source = request.form["source"]
-        destination = request.form["destination"]
-        departure_date = request.form["departure_date"]
-        return_date = request.form.get("return_date")
-    else:
-        # coming back here AFTER login via ?next=...
-        trip_type = request.args.get("trip_type", "oneway")
-        source = request.args.get("source")
-        destination = request.args.get("destination")
-        departure_date = request.args.get("departure_date")
-        return_date = request.args.get("return_date")
-
-    print("\n---------------- DEBUG SEARCH INPUT ----------------")
-    print("Source:", source)
-    print("Destination:", destination)
-    print("Departure Date:", departure_date)
-    print("Return Date:", return_date)
-    print("Trip Type:", trip_type)
-    print("---------------------------------------------------\n")
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    one_way_query = """
-        SELECT *
-        FROM Flight
-        WHERE departure_airport = %s
-          AND arrival_airport = %s
-          AND departure_datetime >= GREATEST(%s, NOW())
-          AND departure_datetime < DATE_ADD(%s, INTERVAL 1 DAY);
+    Days missing from the cache are fetched together in one range query.
     """
+    days = [(first_day + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(num_days)]
+    by_day = {day: search_cache.get(source, destination, day) for day in days}
+    missing = [day for day in days if by_day[day] is None]
+
+    if missing:
+        started = time.time()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            #seats sold per flight come along in the same grouped query
+            cursor.execute("""
+                SELECT F.*, A.num_seats, COUNT(T.ticket_id) AS seats_sold
+                FROM Flight F
+                JOIN Airplane A
+                  ON F.airline_name = A.airline_name
+                 AND F.airplane_id = A.airplane_id
+                LEFT JOIN Ticket T
+                  ON T.airline_name = F.airline_name
+                 AND T.flight_number = F.flight_number
+                 AND T.departure_datetime = F.departure_datetime
+                WHERE F.departure_airport = %s
+                  AND F.arrival_airport = %s
+                  AND F.departure_datetime >= %s
+                  AND F.departure_datetime < DATE_ADD(%s, INTERVAL 1 DAY)
+                GROUP BY F.airline_name, F.flight_number, F.departure_datetime, A.num_seats
+                ORDER BY F.departure_datetime;
+            """, (source, destination, missing[0] + " 00:00:00", missing[-1] + " 00:00:00"))
+            rows = cursor.fetchall()
+            cursor.close()
 
-    cursor.execute(one_way_query, (
-        source,
-        destination,
-        departure_date + " 00:00:00",
-        departure_date + " 00:00:00"
-    ))
-    onward_flights = cursor.fetchall()
-
+        loaded = {day: [] for day in missing}
+        for row in rows:
+            day = row["departure_datetime"].strftime("%Y-%m-%d")
+            if day in loaded:
+                loaded[day].append(row)
+        for day, day_rows in loaded.items():
+            search_cache.put(source, destination, day, day_rows, started)
+        by_day.update(loaded)
+
+    # whole days are cached; drop flights that have already left
+    return {day: with_availability([f for f in flights if f["departure_datetime"] >= now])
+            for day, flights in by_day.items()}
+
+def find_flights(source, destination, day, now):
+    first_day = datetime.strptime(day, "%Y-%m-%d")
+    return find_flights_window(source, destination, first_day, 1, now)[day]
+
+#lowest fare and flight count per day, plus the chosen day's flights
+def flexible_search(source, destination, day, flex_days, now):
+    chosen = datetime.strptime(day, "%Y-%m-%d")
+    first_day = max(chosen - timedelta(days=flex_days), datetime(now.year, now.month, now.day))
+    last_day = chosen + timedelta(days=flex_days)
+    num_days = (last_day - first_day).days + 1
+    if num_days < 1:
+        return [], []
+
+    by_day = find_flights_window(source, destination, first_day, num_days, now)
+    calendar = [{
+        "date": d,
+        "flights": len(flights),
+        "lowest_price": min((f["base_price"] for f in flights), default=None),
+        "selected": d == day,
+    } for d, flights in by_day.items()]
+    return calendar, by_day.get(day, [])
+
+#search fields from the form (POST) or query string (GET)
+def search_args(values):
+    stops = values.get("stops", "0")
+    flex_days = values.get("flex_days", "0")
+    return {
+        "trip_type": values.get("trip_type", "oneway"),
+        "source": values.get("source"),
+        "destination": values.get("destination"),
+        "departure_date": values.get("departure_date"),
+        "return_date": values.get("return_date"),
+        "stops": min(max(int(stops), 0), MAX_STOPS) if stops.isdigit() else 0,
+        "flex_days": min(max(int(flex_days), 0), MAX_FLEX_DAYS) if flex_days.isdigit() else 0,
+    }
+
+#the search dates parse as YYYY-MM-DD (return_date may be empty)
+def valid_search_dates(args):
+    try:
+        datetime.strptime(args["departure_date"], "%Y-%m-%d")
+        if args["return_date"]:
+            datetime.strptime(args["return_date"], "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+#direct flights, flexible-date calendars and connections for one search
+def run_search(trip_type, source, destination, departure_date, return_date, stops, flex_days, now):
+    round_trip = trip_type == "round" and return_date
+    onward_calendar = []
+    return_calendar = []
     return_flights = []
-    if trip_type == "round" and return_date:
-        round_query = """
-            SELECT *
-            FROM Flight
-            WHERE departure_airport = %s
-              AND arrival_airport = %s
-              AND departure_datetime >= GREATEST(%s, NOW())
-              AND departure_datetime < DATE_ADD(%s, INTERVAL 1 DAY);
-        """
-        cursor.execute(round_query, (
-            destination,
-            source,
-            return_date + " 00:00:00",
-            return_date + " 00:00:00"
-        ))
-        return_flights = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
+    if flex_days:
+        onward_calendar, onward_flights = flexible_search(
+            source, destination, departure_date, flex_days, now)
+        if round_trip:
+            return_calendar, return_flights = flexible_search(
+                destination, source, return_date, flex_days, now)
+    else:
+        onward_flights = find_flights(source, destination, departure_date, now)
+        if round_trip:
+            return_flights = find_flights(destination, source, return_date, now)
+
+    #one- and two-stop itineraries come from the in-memory route graph
+    onward_connections = []
+    return_connections = []
+    if stops:
+        onward_connections = [it for it in find_connections(source, destination, departure_date, stops)
+                              if it["stops"]]
+        if round_trip:
+            return_connections = [it for it in find_connections(destination, source, return_date, stops)
+                                  if it["stops"]]
+
+    return {
+        "onward_flights": onward_flights,
+        "return_flights": return_flights,
+        "onward_connections": onward_connections,
+        "return_connections": return_connections,
+        "onward_calendar": onward_calendar,
+        "return_calendar": return_calendar,
+    }
 
-    return render_template(
-        "search_result.html",
-        trip_type=trip_type,
-        onward_flights=onward_flights,
-        return_flights=return_flights,
-        source=source,
-        destination=destination,
-        departure_date=departure_date,
-        return_date=return_date,
-        now=datetime.now()
-    )
+#flight search result
+@app.route("/search_result", methods=["GET", "POST"])
+def search_result():
+    # GET when coming back here AFTER login via ?next=...
+    args = search_args(request.form if request.method == "POST" else request.args)
+    if not args["source"] or not args["destination"] or not args["departure_date"]:
+        return "Please choose a source, destination and departure date.", 400
+    if not valid_search_dates(args):
+        return "Dates must be given as YYYY-MM-DD.", 400
+
+    app.logger.debug("search: %(source)s -> %(destination)s on %(departure_date)s (return %(return_date)s, "
+                     "%(trip_type)s, stops=%(stops)s, flex=%(flex_days)s)", args)
+
+    now = datetime.now()
+    results = run_search(now=now, **args)
+    return render_template("search_result.html", now=now, **args, **results)
+
+#JSON search for front ends and partners that poll: unchanged results get a 304
+@app.route("/api/search")
+def api_search():
+    args = search_args(request.args)
+    if not args["source"] or not args["destination"] or not args["departure_date"]:
+        return {"error": "source, destination and departure_date are required"}, 400
+    if not valid_search_dates(args):
+        return {"error": "dates must be YYYY-MM-DD"}, 400
+
+    results = run_search(now=datetime.now(), **args)
+    return json_response(dict(args, **results), max_age=SEARCH_MAX_AGE)
 
 #customer view purchased flight
 @app.route("/my_flights")
 @login_required("customer")
 def my_flights():
-    email = session["username"]
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    upcoming, _ = itinerary_cache.split(session["username"], datetime.now(),
+                                        session.get("itinerary_changed", 0))
+    return render_template("my_flights.html", flights=upcoming)
 
-    cursor.execute("""
-        SELECT 
-            T.ticket_id,
-            T.airline_name,
-            T.flight_number,
-            T.departure_datetime,
-            T.seat_number,
-
-            F.departure_airport,
-            F.arrival_airport,
-            F.arrival_datetime,
-            F.departure_datetime AS flight_departure,
-            F.base_price AS base_price,
-
-            T.card_type AS payment_method
-
-        FROM Ticket T
-        JOIN Flight F
-          ON T.airline_name = F.airline_name
-         AND T.flight_number = F.flight_number
-         AND T.departure_datetime = F.departure_datetime
-        
-        WHERE T.customer_email = %s
-        AND F.departure_datetime >= NOW()
-        ORDER BY F.departure_datetime;
-    """, (email,))
-
-    tickets = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    return render_template("my_flights.html", flights=tickets)
+#the customer's tickets changed: drop their cached itinerary here, and stamp the
+#session so a worker still holding an older copy reloads it too
+def itinerary_changed(email):
+    itinerary_cache.invalidate_customer(email)
+    session["itinerary_changed"] = time.time()
 
 #purchase ticket
 @app.route("/purchase/<airline>/<flight>/<departure_raw>", methods=["GET", "POST"])
@@ -321,90 +383,60 @@ def my_flights():
 def purchase(airline, flight, departure_raw):
     departure = departure_raw.replace("_", " ")
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    #Get flight + airplane num_seats
-    cursor.execute("""
-        SELECT F.*, A.num_seats
-        FROM Flight F
-        JOIN Airplane A
-          ON F.airline_name = A.airline_name
-         AND F.airplane_id = A.airplane_id
-        WHERE F.airline_name=%s
-          AND F.flight_number=%s
-          AND F.departure_datetime=%s
-    """, (airline, flight, departure))
-    flight_data = cursor.fetchone()
+        #Get flight + airplane num_seats
+        cursor.execute("""
+            SELECT F.*, A.num_seats
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.airline_name=%s
+              AND F.flight_number=%s
+              AND F.departure_datetime=%s
+        """, (airline, flight, departure))
+        flight_data = cursor.fetchone()
 
-    if not flight_data:
-        cursor.close()
-        conn.close()
-        return "Flight not found.", 404
-
-    #Find already occupied seats
-    cursor2 = conn.cursor()
-    cursor2.execute("""
-        SELECT seat_number
-        FROM Ticket
-        WHERE airline_name=%s
-          AND flight_number=%s
-          AND departure_datetime=%s
-    """, (airline, flight, departure))
+        if not flight_data:
+            cursor.close()
+            return "Flight not found.", 404
 
-    occupied = {row[0] for row in cursor2.fetchall()}  
-    cursor2.close()
+        #occupied seats come from the cached seat bitmap
+        num_seats = int(flight_data["num_seats"])
+        seat_map = seat_inventory.get(conn, airline, flight, departure, num_seats)
+        available_seats = seat_map.available()
 
-    #Generate all seats 
-    num_seats = int(flight_data["num_seats"]) 
-    all_seats = generate_seat_labels(num_seats)
-    available_seats = [s for s in all_seats if s not in occupied]
+        #try to purchase 
+        if request.method == "POST":
+            seat = request.form["seat_number"]
+            card_type = request.form["card_type"]
+            card_number = request.form["card_number"]
+            card_expiration = request.form["card_expiration"]
+            name_on_card = request.form["name_on_card"]
 
-    #try to purchase 
-    if request.method == "POST":
-        seat = request.form["seat_number"]
-        card_type = request.form["card_type"]
-        card_number = request.form["card_number"]
-        card_expiration = request.form["card_expiration"]
-        name_on_card = request.form["name_on_card"]
-        
-        cursor3 = conn.cursor()
-        cursor3.execute("""
-            SELECT 1 FROM Ticket
-            WHERE airline_name=%s
-              AND flight_number=%s
-              AND departure_datetime=%s
-              AND seat_number=%s
-        """, (airline, flight, departure, seat))
-        if cursor3.fetchone():
-            cursor3.close()
             cursor.close()
-            conn.close()
-            return "Sorry, that seat was just taken. Please go back and choose another.", 400
-
-        cursor3.close()
-
-        # Insert ticket
-        cursor4 = conn.cursor()
-        cursor4.execute("""
-            INSERT INTO Ticket
-            (customer_email, airline_name, flight_number, departure_datetime,
-             seat_number, purchase_date, card_type, card_number, card_expiration, name_on_card)
-            VALUES (%s, %s, %s, %s, %s, CURDATE(), %s, %s, %s, %s)
-        """, (
-            session["username"], airline, flight, departure,
-            seat, card_type, card_number, card_expiration, name_on_card
-        ))
-
-        conn.commit()
-        cursor4.close()
-        cursor.close()
-        conn.close()
 
-        return render_template("purchase_success.html")
+            if not seat_map.is_valid(seat):
+                return "Invalid seat number.", 400
+
+            #already known to be sold, no need to ask the database
+            if not seat_map.is_free(seat):
+                contention.record_rejected((airline, flight, departure))
+                return "Sorry, that seat was just taken. Please go back and choose another.", 400
+
+            # Insert ticket; the unique seat key rejects a double booking
+            try:
+                book_seat(conn, session["username"], airline, flight, departure, seat,
+                          card_type, card_number, card_expiration, name_on_card)
+            except SeatTakenError:
+                return "Sorry, that seat was just taken. Please go back and choose another.", 400
+            itinerary_changed(session["username"])
 
-    cursor.close()
-    conn.close()
+            return render_template("purchase_success.html")
+
+        cursor.close()
 
     return render_template("purchase.html",
                            flight=flight_data,
@@ -413,6 +445,78 @@ def purchase(airline, flight, departure_raw):
                            departure_datetime=departure,
                            available_seats=available_seats)
   
+#seat occupancy as a bitstring (character i = seat i, "1" = sold)
+def seat_map_payload(airline, flight, departure):
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT A.num_seats
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.airline_name=%s
+              AND F.flight_number=%s
+              AND F.departure_datetime=%s
+        """, (airline, flight, departure))
+        row = cursor.fetchone()
+        cursor.close()
+        if not row:
+            return None
+        seat_map = seat_inventory.get(conn, airline, flight, departure, int(row["num_seats"]))
+    return {
+        "num_seats": seat_map.num_seats,
+        "letters": SEAT_LETTERS[:seat_map.per_row],
+        "sold": seat_map.sold,
+        "bits": seat_map.bitstring(),
+    }
+
+@app.route("/api/seatmap/<airline>/<flight>/<departure_raw>")
+def seat_map(airline, flight, departure_raw):
+    payload = seat_map_payload(airline, flight, departure_raw.replace("_", " "))
+    if payload is None:
+        return {"error": "Flight not found."}, 404
+    return json_response(payload)
+
+#live seat sales as server-sent events, for one or more flights given as
+#?flight=AIRLINE|FLIGHT|YYYY-MM-DD_HH:MM:SS (a round trip watches both legs on one stream).
+#Each open stream holds a server thread: SEAT_STREAMS caps them per process and
+#must stay below the server's threads per process.
+app.config.setdefault("SEAT_STREAMS", SEAT_STREAMS)
+
+@app.route("/api/seatmap/events")
+@login_required("customer")
+def seat_events():
+    specs = request.args.getlist("flight")
+    if not specs or len(specs) > MAX_STREAM_FLIGHTS or any(s.count("|") != 2 for s in specs):
+        return {"error": f"give 1 to {MAX_STREAM_FLIGHTS} flight=AIRLINE|FLIGHT|DEPARTURE"}, 400
+    keys = []
+    for spec in specs:
+        airline, flight, departure = spec.split("|")
+        key = (airline, flight, departure.replace("_", " "))
+        if key not in keys:
+            keys.append(key)
+
+    #subscribed before the maps are read, so no sale falls between the two
+    q = seat_broker.subscribe(keys, app.config["SEAT_STREAMS"])
+    if q is None:
+        return {"error": "Too many open seat streams, try again shortly."}, 503, {"Retry-After": "30"}
+    try:
+        maps = {key: seat_map_payload(*key) for key in keys}
+    except Exception:
+        seat_broker.unsubscribe(q)
+        raise
+    missing = [key for key, payload in maps.items() if payload is None]
+    if missing:
+        seat_broker.unsubscribe(q)
+        return {"error": f"Flight {'|'.join(missing[0])} not found."}, 404
+
+    response = Response(seat_broker.stream(q, maps), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    #also runs when the client leaves before the stream starts
+    response.call_on_close(lambda: seat_broker.unsubscribe(q))
+    return response
+
 #purchase round trip
 @app.route("/purchase_round", methods=["GET", "POST"])
 @login_required("customer")
@@ -443,20 +547,9 @@ def purchase_round():
             return None, []
 
         #occupied seats
-        cur2 = conn.cursor()
-        cur2.execute("""
-            SELECT seat_number
-            FROM Ticket
-            WHERE airline_name=%s
-              AND flight_number=%s
-              AND departure_datetime=%s
-        """, (airline, flight, departure))
-        occupied = {row[0] for row in cur2.fetchall()}
-        cur2.close()
-
-        num_seats = int(flight_data["num_seats"])   
-        all_seats = generate_seat_labels(num_seats)
-        available = [s for s in all_seats if s not in occupied]
+        num_seats = int(flight_data["num_seats"])
+        seat_map = seat_inventory.get(conn, airline, flight, departure, num_seats)
+        available = seat_map.available()
         cur.close()
         return flight_data, available
 
@@ -471,16 +564,13 @@ def purchase_round():
         on_airline, on_flight, on_dep = parse_choice(onward_choice)
         ret_airline, ret_flight, ret_dep = parse_choice(return_choice)
 
-        conn = get_db_connection()
-
-        onward_flight, available_onward = load_flight_and_available(
-            conn, on_airline, on_flight, on_dep
-        )
-        return_flight, available_return = load_flight_and_available(
-            conn, ret_airline, ret_flight, ret_dep
-        )
-
-        conn.close()
+        with db_connection() as conn:
+            onward_flight, available_onward = load_flight_and_available(
+                conn, on_airline, on_flight, on_dep
+            )
+            return_flight, available_return = load_flight_and_available(
+                conn, ret_airline, ret_flight, ret_dep
+            )
 
         if not onward_flight or not return_flight:
             return "Could not load one of the selected flights.", 404
@@ -514,52 +604,29 @@ def purchase_round():
     card_expiration = request.form["card_expiration"]
     name_on_card = request.form["name_on_card"]
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    #check onward seat
-    cur.execute("""
-        SELECT 1 FROM Ticket
-        WHERE airline_name=%s
-          AND flight_number=%s
-          AND departure_datetime=%s
-          AND seat_number=%s
-    """, (on_airline, on_flight, on_dep, seat_onward))
-    if cur.fetchone():
-        conn.close()
-        return "Onward seat already taken. Please go back and choose another.", 400
-
-    #check return seat 
-    cur.execute("""
-        SELECT 1 FROM Ticket
-        WHERE airline_name=%s
-          AND flight_number=%s
-          AND departure_datetime=%s
-          AND seat_number=%s
-    """, (ret_airline, ret_flight, ret_dep, seat_return))
-    if cur.fetchone():
-        conn.close()
-        return "Return seat already taken. Please go back and choose another.", 400
-
-    #insert both tickets
-    cur.execute("""
-        INSERT INTO Ticket
-        (customer_email, airline_name, flight_number, departure_datetime,
-         seat_number, purchase_date, card_type, card_number, card_expiration, name_on_card)
-        VALUES (%s, %s, %s, %s, %s, CURDATE(), %s, %s, %s, %s)
-    """, (email, on_airline, on_flight, on_dep,
-          seat_onward, card_type, card_number, card_expiration, name_on_card))
-
-    cur.execute("""
-        INSERT INTO Ticket
-        (customer_email, airline_name, flight_number, departure_datetime,
-         seat_number, purchase_date, card_type, card_number, card_expiration, name_on_card)
-        VALUES (%s, %s, %s, %s, %s, CURDATE(), %s, %s, %s, %s)
-    """, (email, ret_airline, ret_flight, ret_dep,
-          seat_return, card_type, card_number, card_expiration, name_on_card))
-
-    conn.commit()
-    conn.close()
+    legs = [
+        (on_airline, on_flight, on_dep, seat_onward),
+        (ret_airline, ret_flight, ret_dep, seat_return),
+    ]
+    taken_messages = [
+        "Onward seat already taken. Please go back and choose another.",
+        "Return seat already taken. Please go back and choose another.",
+    ]
+
+    #seats we already know are sold never reach the database
+    for i, leg in enumerate(legs):
+        if seat_inventory.known_sold(*leg):
+            contention.record_rejected(leg[:3])
+            return taken_messages[i], 400
+
+    #both tickets in one INSERT + COMMIT: either both legs are booked or neither
+    with db_connection() as conn:
+        try:
+            book_seats(conn, email, legs,
+                       card_type, card_number, card_expiration, name_on_card)
+        except SeatTakenError as err:
+            return taken_messages[err.leg], 400
+    itinerary_changed(email)
 
     return render_template("purchase_success.html")
 
@@ -567,29 +634,9 @@ def purchase_round():
 @app.route("/rate_past_flights")
 @login_required("customer")
 def rate_past_flights():
-    email = session["username"]
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT T.ticket_id, T.airline_name, T.flight_number,
-               T.departure_datetime, F.departure_airport, F.arrival_airport
-        FROM Ticket T
-        JOIN Flight F
-          ON T.airline_name=F.airline_name
-         AND T.flight_number=F.flight_number
-         AND T.departure_datetime=F.departure_datetime
-        WHERE customer_email=%s
-          AND F.departure_datetime < NOW()
-        ORDER BY F.departure_datetime DESC;
-    """, (email,))
-
-    flights = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    return render_template("rate_past_flights.html", past_flights=flights)
+    _, past = itinerary_cache.split(session["username"], datetime.now(),
+                                    session.get("itinerary_changed", 0))
+    return render_template("rate_past_flights.html", past_flights=past)
 
 #rate one flight
 @app.route("/rate_flight/<int:ticket_id>", methods=["GET", "POST"])
@@ -597,45 +644,52 @@ def rate_past_flights():
 def rate_flight(ticket_id):
     email = session["username"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("""
-        SELECT *
-        FROM Ticket
-        WHERE ticket_id=%s AND customer_email=%s
-    """, (ticket_id, email))
+        cursor.execute("""
+            SELECT *
+            FROM Ticket
+            WHERE ticket_id=%s AND customer_email=%s
+        """, (ticket_id, email))
 
-    ticket = cursor.fetchone()
+        ticket = cursor.fetchone()
 
-    if not ticket:
-        return "Not your ticket."
+        if not ticket:
+            return "Not your ticket."
 
-    dep_dt = ticket["departure_datetime"]
-    if isinstance(dep_dt, str):
-        dep_dt = datetime.strptime(dep_dt, "%Y-%m-%d %H:%M:%S")
+        dep_dt = ticket["departure_datetime"]
+        if isinstance(dep_dt, str):
+            dep_dt = datetime.strptime(dep_dt, "%Y-%m-%d %H:%M:%S")
 
-    if dep_dt > datetime.now():
-        return "You cannot rate future flights."
+        if dep_dt > datetime.now():
+            return "You cannot rate future flights."
 
-    if request.method == "POST":
-        rating = request.form["rating"]
-        comment = request.form["comment"]
+        if request.method == "POST":
+            rating = request.form["rating"]
+            comment = request.form["comment"]
 
-        cursor.execute("""INSERT INTO FlightRating
-                    (customer_email, airline_name, flight_number,
-                        departure_datetime, rating, comment)
-                        VALUES (%s, %s, %s, %s, %s, %s)""", 
-                        (email, ticket["airline_name"], ticket["flight_number"],
-              ticket["departure_datetime"], rating, comment))
+            if not rating.isdigit() or int(rating) not in STARS:
+                cursor.close()
+                return "Rating must be between 1 and 5.", 400
+            rating = int(rating)
 
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return render_template("rating_success.html")
+            cursor.execute("""INSERT INTO FlightRating
+                        (customer_email, airline_name, flight_number,
+                            departure_datetime, rating, comment)
+                            VALUES (%s, %s, %s, %s, %s, %s)""", 
+                            (email, ticket["airline_name"], ticket["flight_number"],
+                  ticket["departure_datetime"], rating, comment))
+
+            #keep the per-flight totals in the same transaction
+            record_rating(cursor, ticket["airline_name"], ticket["flight_number"],
+                          ticket["departure_datetime"], rating)
+
+            conn.commit()
+            cursor.close()
+            return render_template("rating_success.html")
 
-    cursor.close()
-    conn.close()
+        cursor.close()
     return render_template("rate_flight.html", ticket=ticket)
 
 #staff login
@@ -646,17 +700,16 @@ def staff_login():
         password_input = request.form["password"]
         hashed = hashlib.md5(password_input.encode()).hexdigest()
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("""
-            SELECT * FROM AirlineStaff
-            WHERE username=%s AND password=%s
-        """, (username, hashed))
-        staff = cursor.fetchone()
+            cursor.execute("""
+                SELECT * FROM AirlineStaff
+                WHERE username=%s AND password=%s
+            """, (username, hashed))
+            staff = cursor.fetchone()
 
-        cursor.close()
-        conn.close()
+            cursor.close()
 
         if staff:
             session["username"] = staff["username"]
@@ -674,12 +727,7 @@ def staff_login():
 def staff_register():
 
     # Load airlines for dropdown
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT airline_name FROM Airline")
-    airlines = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    airlines = get_airlines()
 
     if request.method == "POST":
         username = request.form["username"]
@@ -700,52 +748,51 @@ def staff_register():
 
         hashed_password = hashlib.md5(password.encode()).hexdigest()
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        try:
-            #check duplicate username
-            cursor.execute("SELECT username FROM AirlineStaff WHERE username=%s", (username,))
-            if cursor.fetchone():
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            try:
+                #check duplicate username
+                cursor.execute("SELECT username FROM AirlineStaff WHERE username=%s", (username,))
+                if cursor.fetchone():
+                    return render_template(
+                        "staff_register.html",
+                        airlines=airlines,
+                        error="Username already registered."
+                    )
+
+                cursor.execute("""
+                    INSERT INTO AirlineStaff
+                    (username, password, first_name, last_name, date_of_birth, email, airline_name)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    username,
+                    hashed_password,
+                    first_name,
+                    last_name,
+                    date_of_birth,
+                    email,
+                    airline_name
+                ))
+
+                conn.commit()
+                cursor.close()
+
+                #auto login
+                session["username"] = username
+                session["role"] = "staff"
+                session["airline"] = airline_name
+
+                return redirect(url_for("staff_home"))
+
+            except Exception as e:
+                app.logger.error("Staff registration error: %s", e)
                 return render_template(
                     "staff_register.html",
                     airlines=airlines,
-                    error="Username already registered."
+                    error="Database error. Please try again."
                 )
 
-            cursor.execute("""
-                INSERT INTO AirlineStaff
-                (username, password, first_name, last_name, date_of_birth, email, airline_name)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                username,
-                hashed_password,
-                first_name,
-                last_name,
-                date_of_birth,
-                email,
-                airline_name
-            ))
-
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-            #auto login
-            session["username"] = username
-            session["role"] = "staff"
-            session["airline"] = airline_name
-
-            return redirect(url_for("staff_home"))
-
-        except Exception as e:
-            print("❌ Staff registration error:", e)
-            return render_template(
-                "staff_register.html",
-                airlines=airlines,
-                error="Database error. Please try again."
-            )
-
     return render_template("staff_register.html", airlines=airlines)
 
 #staff home
@@ -762,20 +809,19 @@ def staff_home():
 def staff_view_customers(airline, flight, departure):
     departure = departure.replace("_", " ")
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("""
-        SELECT customer_email, seat_number
-        FROM Ticket
-        WHERE airline_name=%s
-          AND flight_number=%s
-          AND departure_datetime=%s
-    """, (airline, flight, departure))
+        cursor.execute("""
+            SELECT customer_email, seat_number
+            FROM Ticket
+            WHERE airline_name=%s
+              AND flight_number=%s
+              AND departure_datetime=%s
+        """, (airline, flight, departure))
 
-    customers = cursor.fetchall()
-    cursor.close()
-    conn.close()
+        customers = cursor.fetchall()
+        cursor.close()
 
     return render_template("staff_view_customers.html",
                            customers=customers,
@@ -783,98 +829,212 @@ def staff_view_customers(airline, flight, departure):
                            flight=flight,
                            departure=departure)
     
+#WHERE conditions for the staff flight filters (date range, airports)
+def flight_filters(airline, values):
+    """Return (filter_args, conditions, params) built from form/query values."""
+    filter_args = {k: values.get(k) for k in ("start_date", "end_date", "dep_airport", "arr_airport")
+                   if values.get(k)}
+
+    # Build dynamic WHERE clause
+    conditions = ["airline_name = %s"]
+    params = [airline]
+
+    if filter_args.get("start_date"):
+        conditions.append("departure_datetime >= %s")
+        params.append(filter_args["start_date"] + " 00:00:00")
+
+    if filter_args.get("end_date"):
+        conditions.append("departure_datetime <= %s")
+        params.append(filter_args["end_date"] + " 23:59:59")
+
+    if filter_args.get("dep_airport"):
+        conditions.append("departure_airport = %s")
+        params.append(filter_args["dep_airport"])
+
+    if filter_args.get("arr_airport"):
+        conditions.append("arrival_airport = %s")
+        params.append(filter_args["arr_airport"])
+
+    return filter_args, conditions, params
+
 # staff view flights
 @app.route("/staff_view_flights", methods=["GET", "POST"])
 @login_required("staff")
 def staff_view_flights():
     airline = session["airline"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    airports = get_airports()
 
-    cursor.execute("SELECT airport_code FROM Airport")
-    airports = cursor.fetchall()
+    # filters come from the POSTed form, or from the query string on later pages
+    values = request.form if request.method == "POST" else request.args
+    filters_applied = request.method == "POST" or bool(request.args.get("filters"))
+    size = page_size(values.get("page_size"))
+    flight_key = lambda f: (f["departure_datetime"], f["flight_number"])
+    cursor_types = (datetime, (str, int))
 
-    start_date = None
-    end_date = None
-    dep_airport = None
-    arr_airport = None
+    #page tokens are checked up front so a bad one is a 400, not a SQL error
+    after = decode_cursor(request.args.get("after"), cursor_types)
+    upcoming_after = decode_cursor(request.args.get("upcoming_after"), cursor_types)
+    past_after = decode_cursor(request.args.get("past_after"), cursor_types)
+    for name, decoded in (("after", after), ("upcoming_after", upcoming_after), ("past_after", past_after)):
+        if request.args.get(name) and decoded is None:
+            return "Invalid page token.", 400
 
-    if request.method == "POST":
-        start_date = request.form.get("start_date") or None
-        end_date = request.form.get("end_date") or None
-        dep_airport = request.form.get("dep_airport") or None
-        arr_airport = request.form.get("arr_airport") or None
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-        # Build dynamic WHERE clause
-        conditions = ["airline_name = %s"]
-        params = [airline]
+        if filters_applied:
+            filter_args, conditions, params = flight_filters(airline, values)
 
-        if start_date:
-            conditions.append("departure_datetime >= %s")
-            params.append(start_date + " 00:00:00")
+            if after:
+                conditions.append(seek_clause(["departure_datetime", "flight_number"]))
+                params.extend(seek_params(after))
 
-        if end_date:
-            conditions.append("departure_datetime <= %s")
-            params.append(end_date + " 23:59:59")
+            where_clause = " AND ".join(conditions)
 
-        if dep_airport:
-            conditions.append("departure_airport = %s")
-            params.append(dep_airport)
+            query = f"""
+                SELECT *
+                FROM Flight
+                WHERE {where_clause}
+                ORDER BY departure_datetime, flight_number
+                LIMIT %s;
+            """
 
-        if arr_airport:
-            conditions.append("arrival_airport = %s")
-            params.append(arr_airport)
+            cursor.execute(query, tuple(params) + (size + 1,))
+            filtered, next_after = paginate(cursor.fetchall(), size, flight_key)
+
+            cursor.close()
 
-        where_clause = " AND ".join(conditions)
+            return render_template("staff_view_flights.html",
+                                   filtered=filtered,
+                                   airports=airports,
+                                   filters_applied=True,
+                                   filter_args=filter_args,
+                                   next_after=next_after,
+                                   page_size=size,
+                                   now=datetime.now())
 
-        query = f"""
+        cursor.execute(f"""
             SELECT *
             FROM Flight
-            WHERE {where_clause}
-            ORDER BY departure_datetime;
-        """
-
-        cursor.execute(query, tuple(params))
-        filtered = cursor.fetchall()
+            WHERE airline_name = %s
+              AND departure_datetime >= NOW()
+              AND departure_datetime <= DATE_ADD(NOW(), INTERVAL 30 DAY)
+              {"AND " + seek_clause(["departure_datetime", "flight_number"]) if upcoming_after else ""}
+            ORDER BY departure_datetime, flight_number
+            LIMIT %s;
+        """, (airline, *seek_params(upcoming_after or []), size + 1))
+        upcoming, next_upcoming = paginate(cursor.fetchall(), size, flight_key)
+
+        cursor.execute(f"""
+            SELECT *
+            FROM Flight
+            WHERE airline_name = %s
+              AND departure_datetime < NOW()
+              {"AND " + seek_clause(["departure_datetime", "flight_number"], descending=True) if past_after else ""}
+            ORDER BY departure_datetime DESC, flight_number DESC
+            LIMIT %s;
+        """, (airline, *seek_params(past_after or []), size + 1))
+        past, next_past = paginate(cursor.fetchall(), size, flight_key)
 
         cursor.close()
-        conn.close()
 
-        return render_template("staff_view_flights.html",
-                               filtered=filtered,
-                               airports=airports,
-                               filters_applied=True,
-                               now=datetime.now())
+    return render_template("staff_view_flights.html",
+                           upcoming=upcoming,
+                           past=past,
+                           airports=airports,
+                           filters_applied=False,
+                           upcoming_after=request.args.get("upcoming_after"),
+                           past_after=request.args.get("past_after"),
+                           next_upcoming=next_upcoming,
+                           next_past=next_past,
+                           page_size=size)
+
+#streamed CSV/NDJSON download
+def export_response(query, params, filename):
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return "Unsupported export format.", 400
+    return Response(
+        stream_rows(query, params, fmt),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
 
-    
-    cursor.execute("""
-        SELECT *
+#staff export passenger manifest
+@app.route("/staff_export_customers/<airline>/<flight>/<departure>")
+@login_required("staff")
+def staff_export_customers(airline, flight, departure):
+    if airline != session["airline"]:
+        return "You can only export your own airline's flights.", 403
+    departure = departure.replace("_", " ")
+
+    query = """
+        SELECT T.ticket_id, T.seat_number, T.customer_email, C.name,
+               T.purchase_date
+        FROM Ticket T
+        JOIN Customer C ON C.email = T.customer_email
+        WHERE T.airline_name=%s
+          AND T.flight_number=%s
+          AND T.departure_datetime=%s
+        ORDER BY T.seat_number
+    """
+    filename = f"manifest_{flight}_{departure.replace(' ', '_').replace(':', '')}"
+    return export_response(query, (airline, flight, departure), filename)
+
+#staff export flight schedule (same filters as staff_view_flights)
+@app.route("/staff_export_flights")
+@login_required("staff")
+def staff_export_flights():
+    airline = session["airline"]
+    _, conditions, params = flight_filters(airline, request.args)
+
+    query = f"""
+        SELECT airline_name, flight_number, departure_airport, arrival_airport,
+               departure_datetime, arrival_datetime, base_price, airplane_id, status
         FROM Flight
-        WHERE airline_name = %s
-          AND departure_datetime >= NOW()
-          AND departure_datetime <= DATE_ADD(NOW(), INTERVAL 30 DAY)
-        ORDER BY departure_datetime;
-    """, (airline,))
-    upcoming = cursor.fetchall()
+        WHERE {" AND ".join(conditions)}
+        ORDER BY departure_datetime, flight_number
+    """
+    return export_response(query, tuple(params), "flights")
 
+#load one Flight row by key
+def fetch_flight(cursor, airline, flight, departure):
     cursor.execute("""
         SELECT *
         FROM Flight
-        WHERE airline_name = %s
-          AND departure_datetime < NOW()
-        ORDER BY departure_datetime DESC;
-    """, (airline,))
-    past = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
-
-    return render_template("staff_view_flights.html",
-                           upcoming=upcoming,
-                           past=past,
-                           airports=airports,
-                           filters_applied=False)
+        WHERE airline_name=%s
+          AND flight_number=%s
+          AND departure_datetime=%s
+    """, (airline, flight, departure))
+    return cursor.fetchone()
+
+#refresh everything cached about a created/updated flight (a Flight row dict)
+def flight_changed(flight):
+    search_cache.invalidate(flight["departure_airport"], flight["arrival_airport"],
+                            str(flight["departure_datetime"])[:10])
+    if route_graph.built_at:
+        route_graph.upsert(flight)
+    itinerary_cache.invalidate_flight(flight["airline_name"], flight["flight_number"],
+                                      flight["departure_datetime"])
+
+ROUTE_GRAPH_BULK = 100   # more changed flights than this rebuild the route graph instead
+
+#the same for many new flights at once (imports, schedule expansion): each
+#search key is dropped once, and the route graph is rebuilt rather than patched
+def flights_changed(flights):
+    if len(flights) <= ROUTE_GRAPH_BULK:
+        for flight in flights:
+            flight_changed(flight)
+        return
+    days = {(f["departure_airport"], f["arrival_airport"], str(f["departure_datetime"])[:10])
+            for f in flights}
+    for source, destination, day in days:
+        search_cache.invalidate(source, destination, day)
+    route_graph.invalidate()
+    for flight in flights:
+        itinerary_cache.invalidate_flight(flight["airline_name"], flight["flight_number"],
+                                          flight["departure_datetime"])
 
 #staff create flight
 @app.route("/staff_create_flight", methods=["GET", "POST"])
@@ -894,25 +1054,107 @@ def staff_create_flight():
             request.form["airplane_id"]
         )
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("""
-            INSERT INTO Flight
-            (airline_name, flight_number, departure_airport, arrival_airport,
-             departure_datetime, arrival_datetime, base_price, airplane_id, status)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,'On-Time')
-        """, data)
+            cursor.execute("""
+                INSERT INTO Flight
+                (airline_name, flight_number, departure_airport, arrival_airport,
+                 departure_datetime, arrival_datetime, base_price, airplane_id, status)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,'On-Time')
+            """, data)
+            created = fetch_flight(cursor, airline, data[1], data[4])
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
+        if created:
+            flight_changed(created)
         return redirect(url_for("staff_view_flights"))
 
 
     return render_template("staff_create_flight.html")
 
+#staff bulk schedule import (CSV)
+@app.route("/staff_import_flights", methods=["GET", "POST"])
+@login_required("staff")
+def staff_import_flights():
+    airline = session["airline"]
+
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            return render_template("staff_import_flights.html", columns=FLIGHT_CSV_COLUMNS,
+                                   error="Choose a CSV file to import.")
+
+        text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        try:
+            result = import_schedule(airline, text)
+        except (UnicodeDecodeError, csv.Error) as err:
+            #rows are all parsed before any insert, so nothing was imported
+            return render_template("staff_import_flights.html", columns=FLIGHT_CSV_COLUMNS,
+                                   error=f"Could not read the file as a UTF-8 CSV: {err}")
+        flights_changed(result["inserted"])
+
+        return render_template("staff_import_flights.html", columns=FLIGHT_CSV_COLUMNS,
+                               result=result)
+
+    return render_template("staff_import_flights.html", columns=FLIGHT_CSV_COLUMNS)
+
+#generate flights from recurring schedules as the horizon advances, in the
+#background so no request waits on (or fails with) a bulk expansion. Set
+#EXPAND_SCHEDULES = False when cron runs `python schedules.py expand` instead.
+app.config.setdefault("EXPAND_SCHEDULES", True)
+
+@app.before_request
+def start_schedule_expander():
+    if app.config["EXPAND_SCHEDULES"]:
+        schedules.start_expander(flights_changed)
+
+#staff create recurring schedule
+@app.route("/staff_create_schedule", methods=["GET", "POST"])
+@login_required("staff")
+def staff_create_schedule():
+    airline = session["airline"]
+
+    if request.method == "POST":
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            airports, airplanes = load_reference(cursor, airline)
+            try:
+                schedule = schedules.parse_schedule(request.form, airports, airplanes)
+            except ValueError as err:
+                cursor.close()
+                return render_template("staff_create_schedule.html", error=str(err)), 400
+
+            cursor.execute("""
+                INSERT INTO FlightSchedule
+                (airline_name, flight_number, departure_airport, arrival_airport,
+                 departure_time, duration_minutes, days_of_week, base_price, airplane_id,
+                 start_date, end_date)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            """, (
+                airline,
+                schedule["flight_number"],
+                schedule["departure_airport"],
+                schedule["arrival_airport"],
+                schedule["departure_time"],
+                schedule["duration_minutes"],
+                schedule["days_of_week"],
+                schedule["base_price"],
+                schedule["airplane_id"],
+                schedule["start_date"],
+                schedule["end_date"]
+            ))
+            schedule_id = cursor.lastrowid
+            conn.commit()
+            cursor.close()
+
+        flights_changed(schedules.expand(schedule_id=schedule_id))
+        return redirect(url_for("staff_view_flights"))
+
+    return render_template("staff_create_schedule.html")
+
 #staff change flight status
 @app.route("/staff_change_status/<airline>/<flight>/<departure>", methods=["GET", "POST"])
 @login_required("staff")
@@ -922,20 +1164,23 @@ def staff_change_status(airline, flight, departure):
     if request.method == "POST":
         new_status = request.form["status"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("""
-            UPDATE Flight
-            SET status=%s
-            WHERE airline_name=%s
-              AND flight_number=%s
-              AND departure_datetime=%s
-        """, (new_status, airline, flight, departure))
+            cursor.execute("""
+                UPDATE Flight
+                SET status=%s
+                WHERE airline_name=%s
+                  AND flight_number=%s
+                  AND departure_datetime=%s
+            """, (new_status, airline, flight, departure))
+            updated = fetch_flight(cursor, airline, flight, departure)
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+
+        if updated:
+            flight_changed(updated)
         return redirect(url_for("staff_view_flights"))
 
     return render_template("staff_change_status.html",
@@ -950,8 +1195,7 @@ def staff_add_airplane():
     airline = session["airline"]
 
     if request.method == "POST":
-        # Debug: see exactly what keys arrived
-        print("📨 FORM DATA:", request.form)
+        app.logger.debug("add airplane form: %s", request.form.to_dict())
 
         airplane_id   = request.form.get("id")
         num_seats     = request.form.get("seats")          # no KeyError now
@@ -962,33 +1206,82 @@ def staff_add_airplane():
         if not all([airplane_id, num_seats, manufacturer, age]):
             return render_template(
                 "staff_add_airplane.html",
+                columns=AIRPLANE_CSV_COLUMNS,
                 error="Please fill in all fields."
             )
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)   # dict makes template nicer
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)   # dict makes template nicer
 
-        cursor.execute("""
-            INSERT INTO Airplane
-            (airline_name, airplane_id, num_seats, manufacturer, age)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (airline, airplane_id, num_seats, manufacturer, age))
-
-        conn.commit()
-
-        cursor.execute("SELECT * FROM Airplane WHERE airline_name = %s", (airline,))
-        planes = cursor.fetchall()
+            cursor.execute("""
+                INSERT INTO Airplane
+                (airline_name, airplane_id, num_seats, manufacturer, age)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (airline, airplane_id, num_seats, manufacturer, age))
 
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
+        # confirm with just the new row; the full fleet is paged at /staff_fleet
+        plane = {"airplane_id": airplane_id, "num_seats": num_seats,
+                 "manufacturer": manufacturer, "age": age}
         return render_template(
             "staff_airplane_confirm.html",
-            planes=planes,
-            airline=airline
+            planes=[plane],
+            airline=airline,
+            added=True
         )
 
-    return render_template("staff_add_airplane.html")
+    return render_template("staff_add_airplane.html", columns=AIRPLANE_CSV_COLUMNS)
+
+#staff bulk fleet import (CSV)
+@app.route("/staff_import_airplanes", methods=["POST"])
+@login_required("staff")
+def staff_import_airplanes():
+    airline = session["airline"]
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return render_template("staff_add_airplane.html", columns=AIRPLANE_CSV_COLUMNS,
+                               error="Choose a CSV file to import.")
+
+    text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        result = import_fleet(airline, text)
+    except (UnicodeDecodeError, csv.Error) as err:
+        #rows are all parsed before any insert, so nothing was imported
+        return render_template("staff_add_airplane.html", columns=AIRPLANE_CSV_COLUMNS,
+                               error=f"Could not read the file as a UTF-8 CSV: {err}")
+
+    return render_template(
+        "staff_airplane_confirm.html",
+        planes=result["inserted"],
+        airline=airline,
+        added=True,
+        result=result
+    )
+
+#staff fleet view, keyset-paginated by airplane_id
+@app.route("/staff_fleet")
+@login_required("staff")
+def staff_fleet():
+    airline = session["airline"]
+    after = request.args.get("after")
+    limit = page_size(request.args.get("page_size"), FLEET_PAGE_SIZE)
+
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        planes, next_after = fleet_page(cursor, airline, after, limit)
+        cursor.close()
+
+    return render_template(
+        "staff_airplane_confirm.html",
+        planes=planes,
+        airline=airline,
+        after=after,
+        next_after=next_after,
+        limit=limit
+    )
 
 #staff view flight ratings
 @app.route("/staff_ratings/<flight>/<departure>")
@@ -997,31 +1290,27 @@ def staff_ratings(flight, departure):
     airline = session["airline"]
     departure = departure.replace("_", " ")
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    after = request.args.get("after") or None
+    limit = request.args.get("limit", "")
+    limit = min(int(limit), MAX_REVIEWS_PAGE_SIZE) if limit.isdigit() and int(limit) > 0 else REVIEWS_PAGE_SIZE
 
-    # get average rating
-    cursor.execute("""
-        SELECT AVG(rating) AS avg_rating
-        FROM FlightRating
-        WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
-    """, (airline, flight, departure))
-    avg_rating = cursor.fetchone()
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
 
-    # get all reviews
-    cursor.execute("""
-        SELECT customer_email, rating, comment
-        FROM FlightRating
-        WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
-    """, (airline, flight, departure))
-    reviews = cursor.fetchall()
+        # count / average / histogram from FlightRatingStats
+        summary = rating_summary(cursor, airline, flight, departure)
+
+        # one page of reviews
+        reviews, next_after = reviews_page(cursor, airline, flight, departure, after, limit)
 
-    cursor.close()
-    conn.close()
+        cursor.close()
 
     return render_template("staff_ratings.html",
-                           avg=avg_rating,
-                           reviews=reviews)
+                           summary=summary,
+                           reviews=reviews,
+                           after=after,
+                           next_after=next_after,
+                           limit=limit)
     
 #staff view total reports
 @app.route("/staff_reports", methods=["GET", "POST"])
@@ -1029,9 +1318,6 @@ def staff_ratings(flight, departure):
 def staff_reports():
     airline = session["airline"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
     # default last 30 days
     start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
     end_date = datetime.now().strftime("%Y-%m-%d")
@@ -1060,28 +1346,8 @@ def staff_reports():
             start_date = last_year_start.strftime("%Y-%m-%d")
             end_date = last_year_end.strftime("%Y-%m-%d")
 
-    #total tickets sold
-    cursor.execute("""
-        SELECT COUNT(*) AS total_tickets
-        FROM Ticket
-        WHERE airline_name=%s AND purchase_date BETWEEN %s AND %s
-    """, (airline, start_date, end_date))
-    total = cursor.fetchone()
-
-    #monthly breakdown
-    cursor.execute("""
-        SELECT DATE_FORMAT(purchase_date, '%Y-%m') AS month,
-               COUNT(*) AS sold
-        FROM Ticket
-        WHERE airline_name=%s
-          AND purchase_date BETWEEN %s AND %s
-        GROUP BY month
-        ORDER BY month
-    """, (airline, start_date, end_date))
-    monthly = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
+    #total + monthly breakdown from the DailySales rollup
+    total, monthly = sales_report(airline, start_date, end_date)
 
     return render_template("staff_reports.html",
                            total=total,
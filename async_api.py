@@ -0,0 +1,465 @@
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from itsdangerous import BadSignature
+
+import cache
+import db
+from app import app as flask_app, MAX_FLEX_DAYS
+from cache import search_cache
+from seats import SeatMap, seat_inventory, with_availability
+
+#asyncio JSON API for the read-heavy pages, run as its own process next to the
+#Flask app with the same session cookie. Against MySQL both apps need
+#SEARCH_BACKEND=sqlite in their environment so the Flask app's search
+#invalidations reach it; seat maps stay per-process, so availability seen here
+#can lag sales made through Flask by up to seats.SEATMAP_TTL.
+#    python async_api.py --port 8081                   # MySQL through aiomysql
+#    python async_api.py --standin standin.sqlite3     # embedded SQLite stand-in
+#
+#    GET /api/search?source=&destination=&departure_date=[&trip_type=round&return_date=][&flex_days=]
+#    GET /api/seats/<airline>/<flight>/<departure with _ for the space>
+#    GET /api/my_flights                               (customer session cookie)
+#
+#requests wait on a small async connection pool instead of each holding a
+#thread, and identical lookups in flight at the same time share one query.
+#Recurring schedules are expanded by the Flask app (or python schedules.py).
+
+API_POOL_MIN = 2
+API_POOL_SIZE = 20           # connections shared by every concurrent request
+ACQUIRE_TIMEOUT = 5.0        # seconds to wait for a free connection
+KEEPALIVE_TIMEOUT = 15.0     # seconds an idle client connection stays open
+MAX_HEADER_BYTES = 16 * 1024
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+log = logging.getLogger(__name__)
+
+
+class MySQLPool:
+    """aiomysql connection pool over db.db_config; rows come back as dicts."""
+
+    def __init__(self, config=None, size=API_POOL_SIZE):
+        self.config = config or db.db_config
+        self.size = size
+        self._pool = None
+
+    async def open(self):
+        try:
+            import aiomysql
+        except ImportError:
+            raise SystemExit("The async API needs aiomysql (pip install aiomysql), or run it with --standin.")
+        self._cursor_class = aiomysql.DictCursor
+        c = self.config
+        #autocommit, so a reused connection never reads from an old snapshot
+        self._pool = await aiomysql.create_pool(
+            host=c["host"], port=c["port"], user=c["user"], password=c["password"], db=c["database"],
+            minsize=min(API_POOL_MIN, self.size), maxsize=self.size, autocommit=True, pool_recycle=3600)
+
+    async def fetchall(self, query, params=()):
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise db.PoolTimeoutError(f"No database connection free within {ACQUIRE_TIMEOUT}s")
+        try:
+            async with conn.cursor(self._cursor_class) as cursor:
+                await cursor.execute(query, params)
+                return list(await cursor.fetchall())
+        finally:
+            self._pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+
+
+#embedded stand-in: the columns the API reads, in SQLite, for running and
+#testing without a MySQL server
+STANDIN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Airplane (
+    airline_name TEXT, airplane_id TEXT, num_seats INTEGER, manufacturer TEXT, age INTEGER,
+    PRIMARY KEY (airline_name, airplane_id));
+CREATE TABLE IF NOT EXISTS Flight (
+    airline_name TEXT, flight_number TEXT, departure_airport TEXT, arrival_airport TEXT,
+    departure_datetime DATETIME, arrival_datetime DATETIME, base_price NUMERIC,
+    airplane_id TEXT, status TEXT,
+    PRIMARY KEY (airline_name, flight_number, departure_datetime));
+CREATE TABLE IF NOT EXISTS Ticket (
+    ticket_id INTEGER PRIMARY KEY, customer_email TEXT, airline_name TEXT, flight_number TEXT,
+    departure_datetime DATETIME, seat_number TEXT, purchase_date DATE, card_type TEXT,
+    card_number TEXT, card_expiration DATE, name_on_card TEXT);
+"""
+
+sqlite3.register_adapter(datetime, lambda value: value.strftime(DATETIME_FORMAT))
+sqlite3.register_converter("DATETIME", lambda value: datetime.strptime(value.decode(), DATETIME_FORMAT))
+
+
+class StandIn:
+    """SQLite database with the tables the API reads, queried off the event loop.
+
+    Takes the same %s-style queries as MySQL; the API only sends portable SQL.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = None
+        self._lock = threading.Lock()
+
+    async def open(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False,
+                                    detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(STANDIN_SCHEMA)
+
+    def insert(self, table, rows):
+        """Load dict rows into one stand-in table (setup for tests and demos)."""
+        with self._lock:
+            for row in rows:
+                columns = ", ".join(row)
+                marks = ", ".join("?" for _ in row)
+                self.conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({marks})", tuple(row.values()))
+
+    def _fetchall(self, query, params):
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(query.replace("%s", "?"), params).fetchall()]
+
+    async def fetchall(self, query, params=()):
+        return await asyncio.to_thread(self._fetchall, query, params)
+
+    async def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Coalescer:
+    """Lets concurrent callers asking for the same key share one in-flight load."""
+
+    def __init__(self):
+        self._pending = {}
+
+    async def run(self, key, load):
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(load())
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        #shielded: one caller going away must not cancel the load for the rest
+        return await asyncio.shield(task)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def session_data(headers):
+    """The Flask session from the request's cookie, or {} if missing or forged."""
+    try:
+        cookie = SimpleCookie(headers.get("cookie", ""))
+    except CookieError:
+        return {}
+    morsel = cookie.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if morsel is None:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(morsel.value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+def parse_day(value, name):
+    try:
+        return datetime.strptime(value or "", "%Y-%m-%d")
+    except ValueError:
+        raise HTTPError(400, f"{name} must be YYYY-MM-DD")
+
+
+class API:
+    """The request handlers; `dispatch` can be called directly in tests."""
+
+    def __init__(self, database):
+        self.db = database
+        self._loads = Coalescer()
+
+    #search
+
+    async def flights_window(self, source, destination, first_day, num_days, now):
+        """{day string: flights} like app.find_flights_window, through the same search cache."""
+        days = [(first_day + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(num_days)]
+        #the sqlite backend can block on its file lock (up to 5s), so cache calls
+        #run on a worker thread rather than the event loop
+        by_day = await asyncio.to_thread(
+            lambda: {day: search_cache.get(source, destination, day) for day in days})
+        missing = [day for day in days if by_day[day] is None]
+        if missing:
+            by_day.update(await self._loads.run(
+                ("search", source, destination, tuple(missing)),
+                lambda: self._load_days(source, destination, missing)))
+        return {day: with_availability([f for f in flights if f["departure_datetime"] >= now])
+                for day, flights in by_day.items()}
+
+    async def _load_days(self, source, destination, days):
+        started = time.time()
+        end = datetime.strptime(days[-1], "%Y-%m-%d") + timedelta(days=1)
+        rows = await self.db.fetchall("""
+            SELECT F.*, A.num_seats, COUNT(T.ticket_id) AS seats_sold
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            LEFT JOIN Ticket T
+              ON T.airline_name = F.airline_name
+             AND T.flight_number = F.flight_number
+             AND T.departure_datetime = F.departure_datetime
+            WHERE F.departure_airport = %s
+              AND F.arrival_airport = %s
+              AND F.departure_datetime >= %s
+              AND F.departure_datetime < %s
+            GROUP BY F.airline_name, F.flight_number, F.departure_datetime, A.num_seats
+            ORDER BY F.departure_datetime
+        """, (source, destination, days[0] + " 00:00:00", end.strftime(DATETIME_FORMAT)))
+
+        loaded = {day: [] for day in days}
+        for row in rows:
+            day = row["departure_datetime"].strftime("%Y-%m-%d")
+            if day in loaded:
+                loaded[day].append(row)
+        def store():
+            for day, day_rows in loaded.items():
+                search_cache.put(source, destination, day, day_rows, started)
+        await asyncio.to_thread(store)
+        return loaded
+
+    async def day_search(self, source, destination, day, flex_days, now):
+        """{"flights": [...]} for one day, plus a fare calendar when flex_days > 0."""
+        chosen = parse_day(day, "date")
+        if not flex_days:
+            by_day = await self.flights_window(source, destination, chosen, 1, now)
+            return {"flights": by_day[day]}
+
+        first_day = max(chosen - timedelta(days=flex_days), datetime(now.year, now.month, now.day))
+        num_days = (chosen + timedelta(days=flex_days) - first_day).days + 1
+        if num_days < 1:
+            return {"flights": [], "calendar": []}
+        by_day = await self.flights_window(source, destination, first_day, num_days, now)
+        calendar = [{
+            "date": d,
+            "flights": len(flights),
+            "lowest_price": min((f["base_price"] for f in flights), default=None),
+            "selected": d == day,
+        } for d, flights in by_day.items()]
+        return {"flights": by_day.get(day, []), "calendar": calendar}
+
+    async def search(self, args, headers):
+        source = args.get("source")
+        destination = args.get("destination")
+        departure_date = args.get("departure_date")
+        if not source or not destination or not departure_date:
+            raise HTTPError(400, "source, destination and departure_date are required")
+        trip_type = args.get("trip_type", "oneway")
+        return_date = args.get("return_date")
+        flex_days = args.get("flex_days", "0")
+        flex_days = min(int(flex_days), MAX_FLEX_DAYS) if flex_days.isdigit() else 0
+        parse_day(departure_date, "departure_date")
+
+        now = datetime.now()
+        result = {"source": source, "destination": destination, "trip_type": trip_type,
+                  "departure_date": departure_date, "flex_days": flex_days}
+        if trip_type == "round" and return_date:
+            parse_day(return_date, "return_date")
+            result["onward"], result["return"] = await asyncio.gather(
+                self.day_search(source, destination, departure_date, flex_days, now),
+                self.day_search(destination, source, return_date, flex_days, now))
+            result["return_date"] = return_date
+        else:
+            result["onward"] = await self.day_search(source, destination, departure_date, flex_days, now)
+        return result
+
+    #seat availability
+
+    async def seats(self, airline, flight, departure_raw, headers):
+        departure = departure_raw.replace("_", " ")
+        rows = await self.db.fetchall("""
+            SELECT F.*, A.num_seats
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.airline_name=%s
+              AND F.flight_number=%s
+              AND F.departure_datetime=%s
+        """, (airline, flight, departure))
+        if not rows:
+            raise HTTPError(404, "Flight not found.")
+        flight_data = rows[0]
+        num_seats = int(flight_data["num_seats"])
+
+        seat_map = seat_inventory.cached(airline, flight, departure, num_seats)
+        if seat_map is None:
+            seat_map = await self._loads.run(
+                ("seats", airline, str(flight), departure),
+                lambda: self._load_seats(airline, flight, departure, num_seats))
+        return {"flight": flight_data, "num_seats": num_seats,
+                "seats_remaining": seat_map.remaining(), "available_seats": seat_map.available()}
+
+    async def _load_seats(self, airline, flight, departure, num_seats):
+        seat_map = SeatMap(num_seats)
+        rows = await self.db.fetchall("""
+            SELECT seat_number
+            FROM Ticket
+            WHERE airline_name=%s
+              AND flight_number=%s
+              AND departure_datetime=%s
+        """, (airline, flight, departure))
+        for row in rows:
+            seat_map.mark(row["seat_number"])
+        seat_inventory.store(airline, flight, departure, seat_map)
+        return seat_map
+
+    #customer's upcoming flights
+
+    async def my_flights(self, args, headers):
+        user = session_data(headers)
+        if "username" not in user or user.get("role") != "customer":
+            raise HTTPError(401, "Log in as a customer first.")
+
+        tickets = await self.db.fetchall("""
+            SELECT
+                T.ticket_id,
+                T.airline_name,
+                T.flight_number,
+                T.departure_datetime,
+                T.seat_number,
+                F.departure_airport,
+                F.arrival_airport,
+                F.arrival_datetime,
+                F.base_price,
+                T.card_type AS payment_method
+            FROM Ticket T
+            JOIN Flight F
+              ON T.airline_name = F.airline_name
+             AND T.flight_number = F.flight_number
+             AND T.departure_datetime = F.departure_datetime
+            WHERE T.customer_email = %s
+              AND F.departure_datetime >= %s
+            ORDER BY F.departure_datetime
+        """, (user["username"], datetime.now().strftime(DATETIME_FORMAT)))
+        return {"flights": tickets}
+
+    #HTTP
+
+    async def dispatch(self, method, target, headers):
+        """(status, payload dict) for one request."""
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        args = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if method not in ("GET", "HEAD"):
+            return 405, {"error": "Only GET is supported."}
+        try:
+            if parts == ["api", "search"]:
+                return 200, await self.search(args, headers)
+            if len(parts) == 5 and parts[:2] == ["api", "seats"]:
+                return 200, await self.seats(*parts[2:], headers)
+            if parts == ["api", "my_flights"]:
+                return 200, await self.my_flights(args, headers)
+            return 404, {"error": "Not found."}
+        except HTTPError as err:
+            return err.status, {"error": err.message}
+        except db.PoolTimeoutError as err:
+            return 503, {"error": str(err)}
+        except Exception:
+            log.exception("%s %s failed", method, target)
+            return 500, {"error": "Internal error."}
+
+    async def handle_client(self, reader, writer):
+        """One client connection: HTTP/1.1 requests until it closes or idles out."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, "GET", 431, {"error": "Headers too large."}, False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    await self.respond(writer, "GET", 400, {"error": "Bad request line."}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+                    keep_alive = False   # no request bodies on a read-only API; don't try to skip them
+
+                status, payload = await self.dispatch(method, target, headers)
+                await self.respond(writer, method, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode()
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + (body if method != "HEAD" else b""))
+        await writer.drain()
+
+
+async def serve(database, host="127.0.0.1", port=8081):
+    await database.open()
+    api = API(database)
+    server = await asyncio.start_server(api.handle_client, host, port,
+                                        limit=MAX_HEADER_BYTES, backlog=4096)
+    log.info("async API listening on %s:%s", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the asyncio JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--pool-size", type=int, default=API_POOL_SIZE, help="MySQL connections")
+    parser.add_argument("--database", help="database to read (default: db.db_config)")
+    parser.add_argument("--standin", metavar="PATH",
+                        help="serve from this SQLite file instead of MySQL (created if missing)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.database:
+        db.db_config["database"] = args.database
+    if not args.standin and cache.SEARCH_BACKEND != "sqlite":
+        parser.error("run both this and the Flask app with SEARCH_BACKEND=sqlite in the environment "
+                     "so search invalidations from the Flask app reach this process (or use --standin)")
+    database = StandIn(args.standin) if args.standin else MySQLPool(size=args.pool_size)
+    try:
+        asyncio.run(serve(database, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
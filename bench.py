@@ -0,0 +1,256 @@
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import db
+
+#route benchmarks through the Flask test client against a seeded database
+#(python seed.py --scale small), e.g.
+#    python bench.py --requests 500 --output before.json
+#    python bench.py --requests 500 --compare before.json
+
+SCENARIOS = ["search", "search_connections", "purchase_page", "purchase",
+             "my_flights", "staff_view_flights", "staff_reports"]
+WRITE_SCENARIOS = {"purchase"}   # only run with --writes (they sell seats); a 400 is a taken seat
+COUNTED_TABLES = ["Airport", "Airline", "Airplane", "Customer", "Flight", "Ticket", "FlightRating"]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def load_targets(limit=2000):
+    """Flights, customers and staff to aim requests at (read before timing starts)."""
+    with db.db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT F.airline_name, F.flight_number, F.departure_datetime,
+                   F.departure_airport, F.arrival_airport, A.num_seats
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.departure_datetime > NOW()
+            ORDER BY F.departure_datetime
+            LIMIT %s
+        """, (limit,))
+        flights = cursor.fetchall()
+        cursor.execute("SELECT DISTINCT customer_email FROM Ticket LIMIT %s", (limit,))
+        customers = [row["customer_email"] for row in cursor.fetchall()]
+        cursor.execute("SELECT username, airline_name FROM AirlineStaff LIMIT %s", (limit,))
+        staff = cursor.fetchall()
+
+        counts = {}
+        for table in COUNTED_TABLES:
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+            counts[table] = cursor.fetchone()["n"]
+        cursor.close()
+    return {"flights": flights, "customers": customers, "staff": staff, "counts": counts}
+
+def build_request(name, targets, rng):
+    """(session dict, method, url, form data) for one request of scenario `name`."""
+    customer = {"username": rng.choice(targets["customers"]) if targets["customers"] else "nobody",
+                "role": "customer"}
+    flight = rng.choice(targets["flights"])
+    departure = str(flight["departure_datetime"])
+
+    if name in ("search", "search_connections"):
+        url = (f"/search_result?trip_type=oneway&source={flight['departure_airport']}"
+               f"&destination={flight['arrival_airport']}&departure_date={departure[:10]}")
+        if name == "search_connections":
+            url += "&stops=1&flex_days=3"
+        return customer, "GET", url, None
+
+    flight_url = f"/purchase/{flight['airline_name']}/{flight['flight_number']}/{departure.replace(' ', '_')}"
+    if name == "purchase_page":
+        return customer, "GET", flight_url, None
+    if name == "purchase":
+        from seats import seat_labels
+        return customer, "POST", flight_url, {
+            "seat_number": rng.choice(seat_labels(flight["num_seats"])),
+            "card_type": "credit",
+            "card_number": "4000000000000000",
+            "card_expiration": "2030-12-01",
+            "name_on_card": "Bench",
+        }
+    if name == "my_flights":
+        return customer, "GET", "/my_flights", None
+
+    staff = rng.choice(targets["staff"])
+    staff_session = {"username": staff["username"], "role": "staff", "airline": staff["airline_name"]}
+    if name == "staff_view_flights":
+        return staff_session, "GET", "/staff_view_flights", None
+    if name == "staff_reports":
+        today = datetime.now().date()
+        return staff_session, "POST", "/staff_reports", {
+            "filter_type": "range",
+            "start_date": str(today - timedelta(days=180)),
+            "end_date": str(today),
+        }
+    raise ValueError(f"unknown scenario {name}")
+
+def run_scenario(webapp, name, targets, requests, warmup, concurrency, seed):
+    """Time `requests` requests of one scenario; returns its summary dict."""
+    rng = random.Random(seed)
+    plans = [build_request(name, targets, rng) for _ in range(warmup + requests)]
+    statements = [0]
+    lock = threading.Lock()
+
+    def count(record):
+        with lock:
+            statements[0] += 1
+
+    def send(client, plan):
+        session_data, method, url, data = plan
+        with client.session_transaction() as session:
+            session.clear()
+            session.update(session_data)
+        started = time.perf_counter()
+        response = client.open(url, method=method, data=data)
+        response.get_data()
+        return time.perf_counter() - started, response.status_code
+
+    warm = webapp.app.test_client()
+    for plan in plans[:warmup]:
+        send(warm, plan)
+
+    timed = plans[warmup:]
+    local = threading.local()
+
+    def worker(plan):
+        if not hasattr(local, "client"):
+            local.client = webapp.app.test_client()
+        return send(local.client, plan)
+
+    db.add_statement_listener(count)
+    started = time.perf_counter()
+    try:
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as pool:
+                results = list(pool.map(worker, timed))
+        else:
+            results = [worker(plan) for plan in timed]
+    finally:
+        wall = time.perf_counter() - started
+        db.remove_statement_listener(count)
+
+    latencies = sorted(seconds for seconds, _ in results)
+    #buying a seat someone already took is an expected outcome, not an error
+    conflicts = sum(1 for _, status in results if status == 400) if name in WRITE_SCENARIOS else 0
+    errors = sum(1 for _, status in results if status >= 400) - conflicts
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "conflicts": conflicts,
+        "concurrency": concurrency,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "throughput_rps": round(len(results) / wall, 1) if wall else None,
+        "queries_per_request": round(statements[0] / len(results), 2) if results else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(scenarios, requests=200, warmup=20, concurrency=1, seed=1, log=None, writes=False):
+    """Benchmark `scenarios`; those in WRITE_SCENARIOS are refused unless `writes`."""
+    blocked = [s for s in scenarios if s in WRITE_SCENARIOS and not writes]
+    if blocked:
+        raise ValueError(f"these scenarios buy tickets: {', '.join(blocked)}; pass writes=True to run them")
+    import app as webapp
+
+    targets = load_targets()
+    if not targets["flights"] or not targets["staff"]:
+        raise SystemExit("No upcoming flights or staff found; seed the database first (python seed.py).")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "database": db.db_config.get("database"),
+            "rows": targets["counts"],
+            "requests": requests,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "scenarios": {},
+    }
+    for name in scenarios:
+        result = run_scenario(webapp, name, targets, requests, warmup, concurrency, seed)
+        report["scenarios"][name] = result
+        if log:
+            log(f"{name}: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"{result['throughput_rps']} req/s, {result['errors']} errors"
+                + (f", {result['conflicts']} seat conflicts" if name in WRITE_SCENARIOS else ""))
+    return report
+
+def compare(baseline, current):
+    """{scenario: {metric: current / baseline}} for the latency and throughput metrics."""
+    ratios = {}
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        ratios[name] = {
+            metric: round(now[metric] / before[metric], 3)
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+            if now.get(metric) and before.get(metric)
+        }
+    return ratios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark routes against a seeded database.")
+    parser.add_argument("scenarios", nargs="*", help=f"default: all read scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--writes", action="store_true", help="include scenarios that buy tickets")
+    parser.add_argument("--database", help="database to run against (default: db.db_config)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to compute ratios against")
+    args = parser.parse_args()
+
+    if args.database:
+        db.db_config["database"] = args.database
+    names = args.scenarios or [s for s in SCENARIOS if args.writes or s not in WRITE_SCENARIOS]
+    unknown = [s for s in names if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    writes = [s for s in names if s in WRITE_SCENARIOS]
+    if writes and not args.writes:
+        parser.error(f"these scenarios buy tickets: {', '.join(writes)}; add --writes to run them")
+
+    report = run(names, args.requests, args.warmup, args.concurrency, args.seed,
+                 log=lambda line: print(line, file=sys.stderr), writes=args.writes)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["compare"] = {"baseline": args.compare, "ratios": compare(json.load(f), report)}
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from sales import record_sales
+from seats import seat_inventory
+
+#needs migrations/001_ticket_seat_unique.sql so a taken seat fails the INSERT
+INSERT_TICKETS = """
+    INSERT INTO Ticket
+    (customer_email, airline_name, flight_number, departure_datetime,
+     seat_number, purchase_date, card_type, card_number, card_expiration, name_on_card)
+    VALUES {rows}
+"""
+TICKET_ROW = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+
+MAX_TRACKED_FLIGHTS = 1000
+
+
+class SeatTakenError(Exception):
+    """The seat was sold to someone else first."""
+
+    def __init__(self, airline, flight, departure, seat, leg=0):
+        super().__init__(f"Seat {seat} on {airline} {flight} {departure} is taken.")
+        self.airline = airline
+        self.flight = flight
+        self.departure = departure
+        self.seat = seat
+        self.leg = leg
+
+
+class ContentionStats:
+    """Counts bookings (a round trip is one) and seat conflicts, overall and per flight."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.booked = 0
+        self.conflicts = 0
+        self.rejected = 0      # turned away by the seat bitmap, no query sent
+        self.insert_time = 0.0
+        self.by_flight = Counter()
+
+    def record(self, elapsed, conflict=False, flights=()):
+        """One booking (all of its legs); `flights` are the keys whose seat was taken."""
+        with self._lock:
+            self.attempts += 1
+            self.insert_time += elapsed
+            if conflict:
+                self.conflicts += 1
+                for key in flights:
+                    self.by_flight[key] += 1
+                if len(self.by_flight) > MAX_TRACKED_FLIGHTS:
+                    self.by_flight = Counter(dict(self.by_flight.most_common(MAX_TRACKED_FLIGHTS // 2)))
+            else:
+                self.booked += 1
+
+    def record_rejected(self, key):
+        with self._lock:
+            self.rejected += 1
+            self.by_flight[key] += 1
+
+    def stats(self, top=10):
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "booked": self.booked,
+                "conflicts": self.conflicts,
+                "rejected": self.rejected,
+                "conflict_rate": self.conflicts / self.attempts if self.attempts else 0.0,
+                "avg_insert_time": self.insert_time / self.attempts if self.attempts else 0.0,
+                "hot_flights": [
+                    {"flight": "|".join(key), "conflicts": n}
+                    for key, n in self.by_flight.most_common(top)
+                ],
+            }
+
+
+contention = ContentionStats()
+
+def is_duplicate(err):
+    return getattr(err, "errno", None) == errorcode.ER_DUP_ENTRY
+
+def _taken_legs(conn, legs):
+    """Return indexes of legs whose seat already has a ticket."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT airline_name, flight_number, departure_datetime, seat_number
+        FROM Ticket
+        WHERE (airline_name, flight_number, departure_datetime, seat_number) IN ({})
+        """.format(", ".join(["(%s, %s, %s, %s)"] * len(legs))),
+        tuple(value for leg in legs for value in leg)
+    )
+    sold = {(a, str(f), str(d), s) for a, f, d, s in cur.fetchall()}
+    cur.close()
+    return [i for i, (a, f, d, s) in enumerate(legs) if (a, str(f), str(d), s) in sold]
+
+def book_seats(conn, email, legs, card_type, card_number, card_expiration, name_on_card):
+    """Insert one ticket per (airline, flight, departure, seat) leg in one statement.
+
+    All legs are booked or none are: on a taken seat the transaction is rolled
+    back and SeatTakenError names the first conflicting leg.
+    """
+    keys = [(a, str(f), str(d)) for a, f, d, _ in legs]
+    #one purchase date for the tickets and their DailySales counts
+    today = date.today()
+    params = []
+    for airline, flight, departure, seat in legs:
+        params += [email, airline, flight, departure, seat, today,
+                   card_type, card_number, card_expiration, name_on_card]
+
+    cur = conn.cursor()
+    start = time.perf_counter()
+    try:
+        cur.execute(INSERT_TICKETS.format(rows=", ".join([TICKET_ROW] * len(legs))), params)
+        record_sales(cur, [airline for airline, _, _, _ in legs], today)
+        conn.commit()
+    except mysql.connector.IntegrityError as err:
+        conn.rollback()
+        if not is_duplicate(err):
+            raise
+        elapsed = time.perf_counter() - start
+        taken = _taken_legs(conn, legs)
+        contention.record(elapsed, conflict=True, flights=[keys[i] for i in taken])
+        for i in taken:
+            seat_inventory.mark_sold(*legs[i])
+        #no ticket holds any of the seats now (it was deleted since, or two legs
+        #asked for the same seat): refuse the first leg without marking it sold
+        leg = taken[0] if taken else 0
+        airline, flight, departure, seat = legs[leg]
+        raise SeatTakenError(airline, flight, departure, seat, leg=leg) from err
+    finally:
+        cur.close()
+
+    contention.record(time.perf_counter() - start)
+    for leg in legs:
+        seat_inventory.mark_sold(*leg)
+
+def book_seat(conn, email, airline, flight, departure, seat,
+              card_type, card_number, card_expiration, name_on_card):
+    """Insert one ticket and commit; raises SeatTakenError if the seat is sold."""
+    book_seats(conn, email, [(airline, flight, departure, seat)],
+               card_type, card_number, card_expiration, name_on_card)
@@ -0,0 +1,267 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from db import db_connection
+
+#reference data (Airport, Airline) changes rarely, so keep it for a while
+REFERENCE_TTL = 300  # seconds
+
+#search results are invalidated on flight changes; TTL is only a safety net
+SEARCH_TTL = 120            # seconds
+SEARCH_MAX_ENTRIES = 2000
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "memory")   # or "sqlite" to share one cache across workers
+SEARCH_ROW_VERSION = 2      # bump when the cached row shape changes (a shared sqlite cache outlives deploys)
+SEARCH_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.sqlite3")
+
+
+class ReferenceCache:
+    """Caches the result of one small lookup query for `ttl` seconds.
+
+    Rows are shared between requests, so callers must not modify them.
+    """
+
+    def __init__(self, query, ttl=REFERENCE_TTL):
+        self.query = query
+        self.ttl = ttl
+        self._rows = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self):
+        return self._rows is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self):
+        if self._fresh():
+            self.hits += 1
+            return self._rows
+
+        # only one thread reloads; the others wait and reuse its result
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._rows
+
+            self.misses += 1
+            with db_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(self.query)
+                rows = cursor.fetchall()
+                cursor.close()
+
+            self._rows = rows
+            self._loaded_at = time.monotonic()
+            return rows
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": self._rows is not None,
+            "age": time.monotonic() - self._loaded_at if self._rows is not None else None,
+        }
+
+
+airports = ReferenceCache("SELECT airport_code, city FROM Airport ORDER BY airport_code")
+airlines = ReferenceCache("SELECT airline_name FROM Airline ORDER BY airline_name")
+
+def get_airports():
+    return airports.get()
+
+def get_airlines():
+    return airlines.get()
+
+def invalidate_reference_data():
+    """Call after inserting/updating Airport or Airline rows."""
+    airports.invalidate()
+    airlines.invalidate()
+
+def reference_stats():
+    return {"airports": airports.stats(), "airlines": airlines.stats()}
+
+
+class MemoryBackend:
+    """LRU dict private to this process."""
+
+    def __init__(self, max_entries=SEARCH_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """LRU cache in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path=SEARCH_SQLITE_PATH, max_entries=SEARCH_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl, now)
+        )
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed LIMIT ?)", (excess,)
+            )
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class SearchCache:
+    """Flights for one (source, destination, day), whichever page asks for them.
+
+    A round trip is two lookups (outbound and return leg), so a flight change
+    only ever has to drop the single key for its own route and day.
+    """
+
+    def __init__(self, backend, ttl=SEARCH_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._invalidated_at = {}   # key -> time, so a load racing an invalidation isn't stored
+
+    @staticmethod
+    def key(source, destination, day):
+        return f"v{SEARCH_ROW_VERSION}|{source}|{destination}|{str(day)[:10]}"
+
+    def get(self, source, destination, day):
+        rows = self.backend.get(self.key(source, destination, day))
+        if rows is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return rows
+
+    def put(self, source, destination, day, rows, started):
+        """Store rows loaded since `started` unless the key was invalidated meanwhile."""
+        key = self.key(source, destination, day)
+        if self._invalidated_at.get(key, 0) < started:
+            self.backend.set(key, rows, self.ttl)
+
+    def get_or_load(self, source, destination, day, loader):
+        rows = self.get(source, destination, day)
+        if rows is None:
+            started = time.time()
+            rows = loader()
+            self.put(source, destination, day, rows, started)
+        return rows
+
+    def invalidate(self, source, destination, day):
+        key = self.key(source, destination, day)
+        self.invalidations += 1
+        now = time.time()
+        if len(self._invalidated_at) > SEARCH_MAX_ENTRIES:
+            self._invalidated_at = {k: t for k, t in self._invalidated_at.items() if now - t < 60}
+        self._invalidated_at[key] = now
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self.backend),
+        }
+
+
+def make_search_backend(kind=SEARCH_BACKEND):
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f'SEARCH_BACKEND must be "memory" or "sqlite", not {kind!r}')
+
+search_cache = SearchCache(make_search_backend())
+
+def set_search_backend(backend):
+    search_cache.backend = backend
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:    # gzip only
+    brotli = None
+
+#JSON responses for polled endpoints: a weak ETag from the body answers
+#If-None-Match with an empty 304, and bigger bodies are compressed once per
+#distinct result and served from memory on later polls
+
+COMPRESS_MIN_BYTES = 1024       # smaller bodies aren't worth compressing
+COMPRESSED_CACHE_ENTRIES = 256  # (etag, encoding) -> compressed body
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class CompressedBodies:
+    """LRU of compressed response bodies keyed by (etag, encoding)."""
+
+    def __init__(self, max_entries=COMPRESSED_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag, encoding, body):
+        key = (etag, encoding)
+        with self._lock:
+            data = self._bodies.get(key)
+            if data is not None:
+                self._bodies.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = compress(body, encoding)
+        with self._lock:
+            self._bodies[key] = data
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._bodies)}
+
+
+compressed_bodies = CompressedBodies()
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def choose_encoding(accept):
+    """"br" or "gzip" if the client takes it (brotli only when installed), else None."""
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return None
+
+def json_response(payload, max_age=0):
+    """JSON for the current request with an ETag, 304 support and compression.
+
+    Keys are sorted so equal payloads always serialize (and hash) the same.
+    """
+    body = json.dumps(payload, default=str, sort_keys=True, separators=(",", ":")).encode()
+    etag = hashlib.sha1(body).hexdigest()[:20]
+
+    response = Response(body, mimetype="application/json")
+    #weak: the same tag stands for the identity and compressed encodings
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.vary.add("Accept-Encoding")
+    response.make_conditional(request)
+    if response.status_code != 200 or len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding:
+        response.set_data(compressed_bodies.get(etag, encoding, body))
+        response.headers["Content-Encoding"] = encoding
+    return response
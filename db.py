@@ -1,4 +1,12 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
+from mysql.connector.errors import PoolError
+
+log = logging.getLogger(__name__)
 
 db_config = {
     'host': 'localhost',
@@ -9,12 +17,314 @@ db_config = {
     'auth_plugin': 'mysql_native_password'
 }
 
+#pool settings
+POOL_SIZE = 10               # max open connections per process
+POOL_TIMEOUT = 5.0           # seconds to wait for a free connection
+HEALTH_CHECK_INTERVAL = 30.0 # ping connections idle longer than this
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no pooled connection frees up within the timeout."""
+
+
+#statement listeners: fn(record) is called after every execute()/executemany()
+#on a pooled connection's cursors while registered. `record` is a dict with
+#statement, params, seconds and rows; rows keeps growing as results are fetched.
+_statement_listeners = []
+
+def add_statement_listener(fn):
+    _statement_listeners.append(fn)
+
+def remove_statement_listener(fn):
+    if fn in _statement_listeners:
+        _statement_listeners.remove(fn)
+
+
+class TracedCursor:
+    """Cursor proxy that reports each statement, its duration and row count to the listeners."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._record = None
+
+    def _notify(self, statement, params, started):
+        self._record = {
+            "statement": statement,
+            "params": params,
+            "seconds": time.perf_counter() - started,
+            "rows": max(self._cursor.rowcount, 0),
+        }
+        for fn in list(_statement_listeners):
+            fn(self._record)
+
+    def _fetched(self, result):
+        if self._record is not None:
+            self._record["rows"] = max(self._cursor.rowcount, self._record["rows"])
+        return result
+
+    def execute(self, statement, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(statement, params, *args, **kwargs)
+        finally:
+            self._notify(statement, params, started)
+
+    def executemany(self, statement, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(statement, seq_params, *args, **kwargs)
+        finally:
+            self._notify(statement, seq_params, started)
+
+    def fetchone(self):
+        return self._fetched(self._cursor.fetchone())
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._fetched(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._fetched(row)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Wraps a MySQL connection so that close() hands it back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        if self._conn is None:
+            raise PoolError("Connection already returned to the pool.")
+        cursor = self._conn.cursor(*args, **kwargs)
+        return TracedCursor(cursor) if _statement_listeners else cursor
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise PoolError("Connection already returned to the pool.")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Fixed-size pool of MySQL connections with bounded checkout wait."""
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL, **config):
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.config = config or db_config
+
+        self._cond = threading.Condition()
+        self._idle = []        # (conn, last_used) pairs, most recent last
+        self._opened = 0       # physical connections alive
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._discarded = 0
+
+    def _connect(self):
+        try:
+            return mysql.connector.connect(**self.config)
+        except mysql.connector.Error:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"(pool size {self.size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                elapsed = time.monotonic() - start
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+            self._checkouts += 1
+            self._in_use += 1
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                self._opened += 1
+                conn = None
+
+        if conn is not None and not self._healthy(conn, last_used):
+            self._discard(conn)
+            with self._cond:
+                self._discarded += 1
+            conn = None
+
+        if conn is None:
+            conn = self._connect()
+
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Return a raw connection to the pool, resetting any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except mysql.connector.Error:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._opened -= 1
+                self._discarded += 1
+            self._cond.notify()
+
+        if not reusable:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "total_wait_time": self._wait_time,
+                "avg_wait_time": self._wait_time / self._waits if self._waits else 0.0,
+                "max_wait_time": self._max_wait,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def configure_pool(**settings):
+    """Replace this process's pool with ConnectionPool(**settings), closing the old one's idle connections."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, ConnectionPool(**settings)
+    if old is not None:
+        old.close_all()
+    return _pool
+
+def db_connection(timeout=None):
+    """Context manager yielding a pooled connection, returned on exit."""
+    return get_pool().connection(timeout)
+
+def pool_stats():
+    return get_pool().stats()
+
+def insert_batches(conn, query, rows, params, chunk_size=1000):
+    """executemany `query` over `rows` in chunked transactions.
+
+    A chunk that fails is rolled back and retried row by row so only the bad
+    rows are rejected. Returns (inserted rows, [(row, error message)]).
+    """
+    inserted, failed = [], []
+    cursor = conn.cursor()
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            cursor.executemany(query, [params(r) for r in chunk])
+            conn.commit()
+            inserted.extend(chunk)
+        except mysql.connector.Error:
+            conn.rollback()
+            for row in chunk:
+                try:
+                    cursor.execute(query, params(row))
+                    conn.commit()
+                    inserted.append(row)
+                except mysql.connector.Error as err:
+                    conn.rollback()
+                    failed.append((row, err.msg))
+    cursor.close()
+    return inserted, failed
+
 def get_db_connection():
+    """Check out a pooled connection; close() returns it to the pool."""
     try:
-        conn = mysql.connector.connect(**db_config)
-        print("✅ Connected successfully!")
-        return conn
+        return get_pool().acquire()
     except mysql.connector.Error as err:
-        print(f"Error connecting to DB: {err}")
+        log.error("Error connecting to DB: %s", err)
         return None
-
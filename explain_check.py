@@ -0,0 +1,151 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from db import db_connection, add_statement_listener, remove_statement_listener
+
+#EXPLAIN every SELECT the routes actually run (captured through the db.py
+#statement listener while the app is driven with Flask's test client) and fail
+#on full table scans. Run against a seeded database: python explain_check.py
+
+#reference tables that are read whole on purpose (cached in cache.py / schedules.py)
+ALLOWED_SCANS = {"Airport", "Airline", "FlightSchedule"}
+
+#below this many estimated rows the optimizer may rightly prefer a scan
+MIN_ROWS = 100
+
+def sample_data():
+    """A ticketed flight, its customer and a staff member of its airline."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT T.ticket_id, T.customer_email, F.airline_name, F.flight_number,
+                   F.departure_datetime, F.departure_airport, F.arrival_airport
+            FROM Ticket T
+            JOIN Flight F
+              ON T.airline_name = F.airline_name
+             AND T.flight_number = F.flight_number
+             AND T.departure_datetime = F.departure_datetime
+            LIMIT 1
+        """)
+        sample = cursor.fetchone()
+        if sample:
+            cursor.execute("SELECT username FROM AirlineStaff WHERE airline_name=%s LIMIT 1",
+                           (sample["airline_name"],))
+            staff = cursor.fetchone()
+            sample["staff"] = staff["username"] if staff else "explain-check"
+        cursor.close()
+    return sample
+
+def route_urls(s):
+    """(role, url) pairs covering the read paths of every route."""
+    dep = str(s["departure_datetime"])
+    dep_url = dep.replace(" ", "_")
+    day = dep[:10]
+    month_ago = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    flight = f"{s['airline_name']}/{s['flight_number']}/{dep_url}"
+    search = (f"/search_result?trip_type=round&source={s['departure_airport']}"
+              f"&destination={s['arrival_airport']}&departure_date={day}&return_date={day}")
+    return [
+        (None, "/"),
+        (None, "/search"),
+        ("customer", search),
+        ("customer", search + "&stops=1&flex_days=3"),
+        ("customer", "/my_flights"),
+        ("customer", "/rate_past_flights"),
+        ("customer", f"/rate_flight/{s['ticket_id']}"),
+        ("customer", f"/purchase/{flight}"),
+        ("staff", "/staff_home"),
+        ("staff", "/staff_view_flights"),
+        ("staff", f"/staff_view_flights?start_date={month_ago}&end_date={day}"
+                  f"&dep_airport={s['departure_airport']}&arr_airport={s['arrival_airport']}"),
+        ("staff", f"/staff_view_customers/{flight}"),
+        ("staff", f"/staff_export_customers/{flight}"),
+        ("staff", "/staff_export_flights"),
+        ("staff", f"/staff_ratings/{s['flight_number']}/{dep_url}"),
+        ("staff", "/staff_reports"),
+        ("staff", "/staff_fleet"),
+    ]
+
+def capture_statements(sample):
+    """Drive the app and return ({statement: params}, [(url, status)])."""
+    import app as webapp
+    from cache import search_cache
+
+    search_cache.clear()
+    captured = {}
+
+    def listener(record):
+        if record["statement"].lstrip().upper().startswith("SELECT"):
+            captured.setdefault(record["statement"], record["params"])
+
+    client = webapp.app.test_client()
+    statuses = []
+    add_statement_listener(listener)
+    try:
+        for role, url in route_urls(sample):
+            with client.session_transaction() as session:
+                session.clear()
+                if role == "customer":
+                    session.update(username=sample["customer_email"], role="customer")
+                elif role == "staff":
+                    session.update(username=sample["staff"], role="staff",
+                                   airline=sample["airline_name"])
+            response = client.get(url)
+            response.get_data()   # run streamed exports to completion
+            statuses.append((url, response.status_code))
+    finally:
+        remove_statement_listener(listener)
+    return captured, statuses
+
+def full_scans(statement, params, min_rows=MIN_ROWS):
+    """EXPLAIN one statement; returns the plan rows that scan a whole table or index."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + statement.strip().rstrip(";"), params)
+        plan = cursor.fetchall()
+        cursor.close()
+
+    bad = []
+    for row in plan:
+        table = row.get("table") or ""
+        if table.startswith("<") or table in ALLOWED_SCANS:
+            continue
+        if row.get("type") in ("ALL", "index") and (row.get("rows") or 0) >= min_rows:
+            bad.append(row)
+    return bad
+
+def check(min_rows=MIN_ROWS, log=print):
+    """Returns the number of statements with a full scan (0 means pass)."""
+    sample = sample_data()
+    if not sample:
+        log("No ticketed flights found; seed the database first.")
+        return 1
+
+    captured, statuses = capture_statements(sample)
+    for url, status in statuses:
+        if status >= 400:
+            log(f"warning: GET {url} returned {status}")
+
+    failures = 0
+    for statement, params in captured.items():
+        bad = full_scans(statement, params, min_rows)
+        if bad:
+            failures += 1
+            log("FULL SCAN:")
+            log("    " + " ".join(statement.split())[:300])
+            for row in bad:
+                log(f"    table={row['table']} type={row['type']} rows={row['rows']} "
+                    f"possible_keys={row.get('possible_keys')}")
+
+    log(f"Checked {len(captured)} statements from {len(statuses)} requests: "
+        f"{failures} with full scans.")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN route queries and fail on full table scans.")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS,
+                        help="ignore scans estimated below this many rows")
+    args = parser.parse_args()
+    sys.exit(1 if check(args.min_rows) else 0)
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+from db import db_connection
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def stream_rows(query, params, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield `query` results as CSV or NDJSON text, chunk_size rows at a time.
+
+    Uses an unbuffered cursor so only one chunk is ever held in memory. The
+    pooled connection stays checked out until the generator finishes or is closed.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            columns = [c[0] for c in cursor.description]
+
+            out = io.StringIO()
+            writer = csv.writer(out) if fmt == "csv" else None
+            if writer:
+                writer.writerow(columns)
+
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if writer:
+                    writer.writerows(rows)
+                else:
+                    for row in rows:
+                        out.write(json.dumps(dict(zip(columns, row)), default=str))
+                        out.write("\n")
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+
+            if writer and out.tell():
+                yield out.getvalue()
+        except GeneratorExit:
+            #the client went away mid-export: read off the rest of the result so
+            #the cursor can close and the connection goes back to the pool usable
+            conn.consume_results()
+            raise
+        finally:
+            cursor.close()
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import time
+
+from db import db_connection, insert_batches
+
+FLEET_PAGE_SIZE = 50
+IMPORT_CHUNK_SIZE = 1000
+
+AIRPLANE_CSV_COLUMNS = ["airplane_id", "num_seats", "manufacturer", "age"]
+
+INSERT_AIRPLANE = """
+    INSERT INTO Airplane
+    (airline_name, airplane_id, num_seats, manufacturer, age)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def airplane_params(plane):
+    return (plane["airline_name"], plane["airplane_id"], plane["num_seats"],
+            plane["manufacturer"], plane["age"])
+
+def add_airplanes(conn, planes, chunk_size=IMPORT_CHUNK_SIZE):
+    """Insert airplane dicts in batches; returns (inserted, [(plane, error)])."""
+    return insert_batches(conn, INSERT_AIRPLANE, planes, airplane_params, chunk_size)
+
+def existing_ids(cursor, airline, ids, chunk_size=IMPORT_CHUNK_SIZE):
+    """Which of `ids` the airline already has (primary-key lookups, no fleet scan)."""
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        cursor.execute(
+            "SELECT airplane_id FROM Airplane WHERE airline_name=%s AND airplane_id IN ({})"
+            .format(", ".join(["%s"] * len(chunk))),
+            (airline, *chunk)
+        )
+        found.update(str(row[0]) for row in cursor.fetchall())
+    return found
+
+def validate_rows(reader, airline):
+    """Split CSV rows into (airplane dicts, [(line, error)])."""
+    planes, errors, seen = [], [], set()
+    for line, raw in enumerate(reader, start=2):   # line 1 is the header
+        values = {k: (raw.get(k) or "").strip() for k in AIRPLANE_CSV_COLUMNS}
+        missing = [k for k, v in values.items() if not v]
+        if missing:
+            errors.append((line, "missing " + ", ".join(missing)))
+        elif not values["num_seats"].isdigit() or int(values["num_seats"]) == 0:
+            errors.append((line, f"bad seat count '{values['num_seats']}'"))
+        elif not values["age"].isdigit():
+            errors.append((line, f"bad age '{values['age']}'"))
+        elif values["airplane_id"] in seen:
+            errors.append((line, "duplicate airplane in file"))
+        else:
+            seen.add(values["airplane_id"])
+            planes.append({
+                "line": line,
+                "airline_name": airline,
+                "airplane_id": values["airplane_id"],
+                "num_seats": int(values["num_seats"]),
+                "manufacturer": values["manufacturer"],
+                "age": int(values["age"]),
+            })
+    return planes, errors
+
+def import_fleet(airline, text_stream, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and bulk-insert an airplane CSV for `airline`.
+
+    Returns {"inserted": [airplane dicts], "errors": [(line, message)], "rows", "seconds"}.
+    """
+    started = time.perf_counter()
+    reader = csv.DictReader(text_stream)
+    missing = [c for c in AIRPLANE_CSV_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        return {"inserted": [], "errors": [(1, "missing columns: " + ", ".join(missing))],
+                "rows": 0, "seconds": 0.0}
+
+    planes, errors = validate_rows(reader, airline)
+    total_rows = len(planes) + len(errors)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        taken = existing_ids(cursor, airline, [p["airplane_id"] for p in planes])
+        cursor.close()
+
+        new_planes = []
+        for plane in planes:
+            if plane["airplane_id"] in taken:
+                errors.append((plane["line"], "airplane already exists"))
+            else:
+                new_planes.append(plane)
+
+        inserted, failed = add_airplanes(conn, new_planes, chunk_size)
+        errors.extend((plane["line"], message) for plane, message in failed)
+
+    errors.sort()
+    return {
+        "inserted": inserted,
+        "errors": errors,
+        "rows": total_rows,
+        "seconds": time.perf_counter() - started,
+    }
+
+def fleet_page(cursor, airline, after=None, limit=FLEET_PAGE_SIZE):
+    """One page of the airline's fleet ordered by airplane_id, starting after `after`.
+
+    Returns (planes, next_after); next_after is None on the last page.
+    """
+    params = [airline]
+    after_clause = ""
+    if after:
+        after_clause = "AND airplane_id > %s"
+        params.append(after)
+    params.append(limit + 1)
+
+    cursor.execute(f"""
+        SELECT airplane_id, num_seats, manufacturer, age
+        FROM Airplane
+        WHERE airline_name=%s {after_clause}
+        ORDER BY airplane_id
+        LIMIT %s
+    """, tuple(params))
+    rows = cursor.fetchall()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, str(last["airplane_id"] if isinstance(last, dict) else last[0])
+    return rows, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import an airplane CSV.")
+    parser.add_argument("airline")
+    parser.add_argument("csv_file")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with open(args.csv_file, newline="", encoding="utf-8") as f:
+        result = import_fleet(args.airline, f, args.chunk_size)
+
+    for line, message in result["errors"]:
+        print(f"line {line}: {message}")
+    print(f"Inserted {len(result['inserted'])} of {result['rows']} airplanes "
+          f"in {result['seconds']:.1f}s ({len(result['errors'])} errors).")
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+from db import db_connection
+
+#each customer's tickets joined with their flights, loaded in one query and
+#split into upcoming and past on read, so my_flights and rate_past_flights
+#share it. Dropped on purchase and flight change in this process;
+#other workers honour the customer's session stamp (see app.itinerary_changed)
+#and otherwise catch up within the TTL.
+
+ITINERARY_TTL = 120            # seconds; bounds staleness from other workers' flight changes
+ITINERARY_MAX_CUSTOMERS = 5000
+
+ITINERARY_QUERY = """
+    SELECT
+        T.ticket_id,
+        T.airline_name,
+        T.flight_number,
+        T.departure_datetime,
+        T.seat_number,
+        T.card_type AS payment_method,
+        F.departure_airport,
+        F.arrival_airport,
+        F.arrival_datetime,
+        F.departure_datetime AS flight_departure,
+        F.base_price,
+        F.status
+    FROM Ticket T
+    JOIN Flight F
+      ON T.airline_name = F.airline_name
+     AND T.flight_number = F.flight_number
+     AND T.departure_datetime = F.departure_datetime
+    WHERE T.customer_email = %s
+    ORDER BY F.departure_datetime
+"""
+
+
+def load_itinerary(email):
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(ITINERARY_QUERY, (email,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+class ItineraryCache:
+    """LRU of customer -> ticket rows, with a flight -> customers index for invalidation.
+
+    Rows are shared between requests, so callers must not modify them.
+    """
+
+    def __init__(self, ttl=ITINERARY_TTL, max_customers=ITINERARY_MAX_CUSTOMERS, loader=load_itinerary):
+        self.ttl = ttl
+        self.max_customers = max_customers
+        self.loader = loader
+        self._entries = OrderedDict()   # email -> (loaded_at, rows)
+        self._by_flight = {}            # (airline, flight, departure) -> {email}
+        self._invalidated_at = {}       # email -> time, so a load racing an invalidation isn't stored
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _flight_key(airline, flight, departure):
+        return (airline, str(flight), str(departure))
+
+    def _drop(self, email):
+        entry = self._entries.pop(email, None)
+        if entry is None:
+            return
+        for row in entry[1]:
+            key = self._flight_key(row["airline_name"], row["flight_number"], row["departure_datetime"])
+            emails = self._by_flight.get(key)
+            if emails is not None:
+                emails.discard(email)
+                if not emails:
+                    del self._by_flight[key]
+
+    def get(self, email, not_before=0.0):
+        """All of the customer's tickets, oldest departure first.
+
+        `not_before` is a time.time() the cached copy must have been loaded after.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] >= not_before and now - entry[0] < self.ttl:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        rows = self.loader(email)
+
+        with self._lock:
+            if self._invalidated_at.get(email, 0) < now:
+                self._drop(email)
+                self._entries[email] = (now, rows)
+                for row in rows:
+                    key = self._flight_key(row["airline_name"], row["flight_number"], row["departure_datetime"])
+                    self._by_flight.setdefault(key, set()).add(email)
+                while len(self._entries) > self.max_customers:
+                    self._drop(next(iter(self._entries)))
+        return rows
+
+    def split(self, email, now, not_before=0.0):
+        """(upcoming soonest first, past most recent first) for one customer."""
+        rows = self.get(email, not_before)
+        upcoming = [r for r in rows if r["departure_datetime"] >= now]
+        past = [r for r in reversed(rows) if r["departure_datetime"] < now]
+        return upcoming, past
+
+    def invalidate_customer(self, email):
+        with self._lock:
+            self.invalidations += 1
+            now = time.time()
+            if len(self._invalidated_at) > self.max_customers:
+                self._invalidated_at = {e: t for e, t in self._invalidated_at.items() if now - t < 60}
+            self._invalidated_at[email] = now
+            self._drop(email)
+
+    def invalidate_flight(self, airline, flight, departure):
+        """Drop every customer holding a ticket on this flight."""
+        with self._lock:
+            emails = list(self._by_flight.get(self._flight_key(airline, flight, departure), ()))
+        for email in emails:
+            self.invalidate_customer(email)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_flight.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "customers": len(self._entries), "flights": len(self._by_flight)}
+
+
+itinerary_cache = ItineraryCache()
@@ -0,0 +1,354 @@
+import atexit
+import glob
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+#Prometheus text-format metrics without the client library.
+#Recording is lock-free: each thread counts into its own shard and a scrape
+#sums the shards. With METRICS_DIR set (one directory shared by all workers,
+#emptied on deploy) each process also dumps its totals there and /metrics
+#merges every file, so counters add up across worker processes.
+#/metrics only answers the addresses in METRICS_ALLOW (local by default; behind
+#a proxy that is the proxy's address, so scrape the workers directly).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_INTERVAL = 5.0     # seconds between per-process dumps to METRICS_DIR
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_ALLOW = os.environ.get("METRICS_ALLOW", "127.0.0.1,::1")   # addresses/networks allowed to scrape
+COLLECT_INTERVAL = FLUSH_INTERVAL   # seconds a merged METRICS_DIR read is reused; files change no faster
+
+
+def _new_shard():
+    return {"requests": {}, "latency": {}, "db_seconds": {}, "db_queries": {}}
+
+def _merge(into, shard):
+    """Add one shard (or process snapshot) into another."""
+    for name in ("requests", "db_seconds", "db_queries"):
+        target = into[name]
+        for key, value in dict(shard[name]).items():
+            target[key] = target.get(key, 0) + value
+    for key, hist in dict(shard["latency"]).items():
+        target = into["latency"].get(key)
+        if target is None:
+            into["latency"][key] = list(hist)
+        else:
+            for i, value in enumerate(hist):
+                target[i] += value
+
+
+class Metrics:
+    """Per-thread request counters and latency histograms, summed on read."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []            # [(thread, shard)]
+        self._retired = _new_shard() # shards of threads that have exited
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _new_shard()
+            with self._lock:
+                #fold in threads that are gone so per-request threads don't pile up
+                alive = []
+                for thread, old in self._shards:
+                    if thread.is_alive():
+                        alive.append((thread, old))
+                    else:
+                        _merge(self._retired, old)
+                alive.append((threading.current_thread(), shard))
+                self._shards = alive
+        return shard
+
+    def observe(self, endpoint, method, status, seconds, db_seconds=0.0, db_queries=0):
+        """Record one finished request (no locks: only this thread writes its shard)."""
+        shard = self._shard()
+        key = (endpoint, method, str(status))
+        shard["requests"][key] = shard["requests"].get(key, 0) + 1
+
+        hist = shard["latency"].get(endpoint)
+        if hist is None:
+            #one count per bucket plus +Inf, then the running sum
+            hist = shard["latency"][endpoint] = [0] * (len(self.buckets) + 2)
+        hist[bisect_left(self.buckets, seconds)] += 1
+        hist[-1] += seconds
+
+        if db_queries:
+            shard["db_seconds"][endpoint] = shard["db_seconds"].get(endpoint, 0.0) + db_seconds
+            shard["db_queries"][endpoint] = shard["db_queries"].get(endpoint, 0) + db_queries
+
+    def snapshot(self):
+        """Totals for this process: request metrics plus cache counters."""
+        total = _new_shard()
+        with self._lock:
+            _merge(total, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _merge(total, shard)
+        total["caches"] = cache_counters()
+        total["components"] = component_counters()
+        return total
+
+
+metrics = Metrics()
+
+def cache_counters():
+    """{cache name: (hits, misses)} from the in-process caches."""
+    from cache import reference_stats, search_cache
+    from conditional import compressed_bodies
+    from itinerary import itinerary_cache
+    from seats import seat_inventory
+
+    counters = {name: (s["hits"], s["misses"]) for name, s in reference_stats().items()}
+    search = search_cache.stats()
+    counters["search"] = (search["hits"], search["misses"])
+    seats = seat_inventory.stats()
+    counters["seat_map"] = (seats["hits"], seats["misses"])
+    itineraries = itinerary_cache.stats()
+    counters["itinerary"] = (itineraries["hits"], itineraries["misses"])
+    bodies = compressed_bodies.stats()
+    counters["compressed_body"] = (bodies["hits"], bodies["misses"])
+    return counters
+
+#name -> (type, help) for the per-component series below
+COMPONENT_METRICS = {
+    "app_bookings_total": ("counter", "Bookings (a round trip is one) by result; rejected ones never reached the database."),
+    "app_booking_conflicts_by_flight": ("gauge", "Seat conflicts and rejects on the most contended flights."),
+    "app_db_pool_checkouts_total": ("counter", "Connections checked out of the pool."),
+    "app_db_pool_waits_total": ("counter", "Checkouts that had to wait for a free connection."),
+    "app_db_pool_wait_seconds_total": ("counter", "Time spent waiting for a free connection."),
+    "app_db_pool_timeouts_total": ("counter", "Checkouts that gave up waiting."),
+    "app_db_pool_discarded_total": ("counter", "Connections dropped as broken or failing their health check."),
+    "app_db_pool_connections": ("gauge", "Open pooled connections by state."),
+    "app_seat_streams": ("gauge", "Open seat-map event streams."),
+    "app_seat_events_total": ("counter", "Seat-map stream events by outcome."),
+}
+
+def component_counters():
+    """{(metric, label, label value): value} from the booking, pool and seat-stream stats."""
+    from booking import contention
+    from db import pool_stats
+    from seat_events import seat_broker
+
+    counters = {}
+    bookings = contention.stats()
+    for result, name in (("booked", "booked"), ("conflict", "conflicts"), ("rejected", "rejected")):
+        counters[("app_bookings_total", "result", result)] = bookings[name]
+    for hot in bookings["hot_flights"]:
+        counters[("app_booking_conflicts_by_flight", "flight", hot["flight"])] = hot["conflicts"]
+
+    pool = pool_stats()
+    counters[("app_db_pool_checkouts_total", "", "")] = pool["checkouts"]
+    counters[("app_db_pool_waits_total", "", "")] = pool["waits"]
+    counters[("app_db_pool_wait_seconds_total", "", "")] = pool["total_wait_time"]
+    counters[("app_db_pool_timeouts_total", "", "")] = pool["timeouts"]
+    counters[("app_db_pool_discarded_total", "", "")] = pool["discarded"]
+    counters[("app_db_pool_connections", "state", "in_use")] = pool["in_use"]
+    counters[("app_db_pool_connections", "state", "idle")] = pool["idle"]
+
+    streams = seat_broker.stats()
+    counters[("app_seat_streams", "", "")] = streams["streams"]
+    for outcome in ("published", "dropped", "refused"):
+        counters[("app_seat_events_total", "outcome", outcome)] = streams[outcome]
+    return counters
+
+
+#multi-process aggregation
+
+_process_file = None
+_flushed_at = 0.0
+_flush_lock = threading.Lock()
+_collected = (0.0, None, None)   # (monotonic time, directory, merged totals) of the last read
+_collect_lock = threading.Lock()
+
+def _encode(snapshot):
+    """JSON-safe copy of a snapshot (tuple keys become lists)."""
+    return {
+        "requests": [[list(k), v] for k, v in snapshot["requests"].items()],
+        "latency": snapshot["latency"],
+        "db_seconds": snapshot["db_seconds"],
+        "db_queries": snapshot["db_queries"],
+        "caches": {name: list(v) for name, v in snapshot["caches"].items()},
+        "components": [[list(k), v] for k, v in snapshot["components"].items()],
+    }
+
+def _decode(data):
+    return {
+        "requests": {tuple(k): v for k, v in data["requests"]},
+        "latency": data["latency"],
+        "db_seconds": data["db_seconds"],
+        "db_queries": data["db_queries"],
+        "caches": {name: tuple(v) for name, v in data["caches"].items()},
+        "components": {tuple(k): v for k, v in data.get("components", [])},
+    }
+
+def flush(directory=None):
+    """Write this process's totals to <directory>/metrics_<pid>_<start>.json."""
+    global _process_file, _flushed_at
+    directory = directory or METRICS_DIR
+    if not directory:
+        return
+    with _flush_lock:
+        if _process_file is None:
+            #pid plus start time: a restarted worker reusing a pid must not overwrite
+            #(and so shrink) the counters of the process it replaced
+            _process_file = os.path.join(directory, f"metrics_{os.getpid()}_{int(time.time() * 1000)}.json")
+        tmp = _process_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_encode(metrics.snapshot()), f)
+        os.replace(tmp, _process_file)
+        _flushed_at = time.monotonic()
+
+def collect(directory=None):
+    """Totals across every process that has written to `directory` (or just this one).
+
+    The merged read is reused for COLLECT_INTERVAL, so frequent scrapes don't
+    rewrite and re-read every process's file each time.
+    """
+    global _collected
+    directory = directory or METRICS_DIR
+    if not directory:
+        return metrics.snapshot()
+
+    with _collect_lock:
+        collected_at, collected_from, total = _collected
+        if collected_from != directory or time.monotonic() - collected_at >= COLLECT_INTERVAL:
+            total = _read_all(directory)
+            _collected = (time.monotonic(), directory, total)
+    return total
+
+def _read_all(directory):
+    flush(directory)
+    total = _new_shard()
+    caches = {}
+    components = {}
+    for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = _decode(json.load(f))
+        except (OSError, ValueError):
+            continue
+        _merge(total, snapshot)
+        for name, (hits, misses) in snapshot["caches"].items():
+            h, m = caches.get(name, (0, 0))
+            caches[name] = (h + hits, m + misses)
+        for key, value in snapshot["components"].items():
+            components[key] = components.get(key, 0) + value
+    total["caches"] = caches
+    total["components"] = components
+    return total
+
+
+#exposition
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def render(snapshot, buckets=LATENCY_BUCKETS):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP app_requests_total Requests by endpoint, method and status.",
+        "# TYPE app_requests_total counter",
+    ]
+    for (endpoint, method, status), n in sorted(snapshot["requests"].items()):
+        lines.append(f"app_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}")
+
+    lines += [
+        "# HELP app_request_duration_seconds Request latency by endpoint.",
+        "# TYPE app_request_duration_seconds histogram",
+    ]
+    for endpoint, hist in sorted(snapshot["latency"].items()):
+        cumulative = 0
+        for bound, n in zip(list(buckets) + ["+Inf"], hist[:-1]):
+            cumulative += n
+            lines.append(f"app_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {cumulative}")
+        lines.append(f"app_request_duration_seconds_sum{_labels(endpoint=endpoint)} {hist[-1]:.6f}")
+        lines.append(f"app_request_duration_seconds_count{_labels(endpoint=endpoint)} {cumulative}")
+
+    lines += [
+        "# HELP app_db_seconds_total Time spent in SQL statements by endpoint.",
+        "# TYPE app_db_seconds_total counter",
+    ]
+    for endpoint, seconds in sorted(snapshot["db_seconds"].items()):
+        lines.append(f"app_db_seconds_total{_labels(endpoint=endpoint)} {seconds:.6f}")
+    lines += [
+        "# HELP app_db_queries_total SQL statements run by endpoint.",
+        "# TYPE app_db_queries_total counter",
+    ]
+    for endpoint, n in sorted(snapshot["db_queries"].items()):
+        lines.append(f"app_db_queries_total{_labels(endpoint=endpoint)} {n}")
+
+    lines += [
+        "# HELP app_cache_hits_total Cache lookups served from memory.",
+        "# TYPE app_cache_hits_total counter",
+    ]
+    lines += [f"app_cache_hits_total{_labels(cache=name)} {hits}"
+              for name, (hits, _) in sorted(snapshot["caches"].items())]
+    lines += [
+        "# HELP app_cache_misses_total Cache lookups that went to the database.",
+        "# TYPE app_cache_misses_total counter",
+    ]
+    lines += [f"app_cache_misses_total{_labels(cache=name)} {misses}"
+              for name, (_, misses) in sorted(snapshot["caches"].items())]
+
+    for metric, (kind, text) in COMPONENT_METRICS.items():
+        series = sorted((k, v) for k, v in snapshot["components"].items() if k[0] == metric)
+        if not series:
+            continue
+        lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+        for (_, label, value), n in series:
+            lines.append(f"{metric}{_labels(**{label: value}) if label else ''} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def _allowed(address, networks):
+    try:
+        address = ipaddress.ip_address(address or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+def init_app(app):
+    """Time every request and serve GET /metrics.
+
+    Config: METRICS_ALLOW, a comma-separated list of addresses or networks
+    that may scrape (defaults to the METRICS_ALLOW environment variable).
+    """
+    allow = app.config.setdefault("METRICS_ALLOW", METRICS_ALLOW)
+    networks = [ipaddress.ip_network(n.strip(), strict=False) for n in allow.split(",") if n.strip()]
+
+    @app.before_request
+    def start_metrics():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_metrics(response):
+        started = g.get("metrics_started")
+        if started is not None and request.endpoint != "metrics_endpoint":
+            queries = g.get("sql_queries") or []
+            metrics.observe(request.endpoint or "unmatched", request.method, response.status_code,
+                            time.perf_counter() - started,
+                            sum(q["seconds"] for q in queries), len(queries))
+            if METRICS_DIR and time.monotonic() - _flushed_at > FLUSH_INTERVAL:
+                flush()
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        if not _allowed(request.remote_addr, networks):
+            return Response("Forbidden\n", status=403, mimetype="text/plain")
+        return Response(render(collect()), mimetype="text/plain; version=0.0.4")
+
+    if METRICS_DIR:
+        atexit.register(flush)
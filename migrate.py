@@ -0,0 +1,114 @@
+import argparse
+import os
+import re
+
+from db import db_connection
+
+#versioned schema migrations: migrations/NNN_name.sql, applied in order and
+#recorded in SchemaVersion so each one runs exactly once per database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+def available():
+    """[(version, name, path)] for every migration file, in version order."""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    found.sort()
+    return found
+
+def statements(sql):
+    """Split a migration file into statements (one per `;` at end of line)."""
+    for chunk in re.split(r";\s*$", sql, flags=re.MULTILINE):
+        lines = [l for l in chunk.splitlines() if l.strip() and not l.strip().startswith("--")]
+        if lines:
+            yield "\n".join(lines)
+
+def ensure_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            version    INT          NOT NULL PRIMARY KEY,
+            name       VARCHAR(100) NOT NULL,
+            applied_at DATETIME     NOT NULL
+        )
+    """)
+
+def applied_versions(cursor):
+    ensure_version_table(cursor)
+    cursor.execute("SELECT version FROM SchemaVersion")
+    return {row[0] for row in cursor.fetchall()}
+
+def record(cursor, version, name):
+    cursor.execute("INSERT INTO SchemaVersion (version, name, applied_at) VALUES (%s, %s, NOW())",
+                   (version, name))
+
+def migrate(target=None, log=print):
+    """Apply every pending migration up to `target` (default: all). Returns versions applied.
+
+    MySQL commits DDL implicitly, so a migration that fails part-way is not
+    recorded; fix it and re-run, and only that migration is retried.
+    """
+    applied = []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        done = applied_versions(cursor)
+        for version, name, path in available():
+            if version in done or (target is not None and version > target):
+                continue
+            log(f"Applying {version:03d}_{name} ...")
+            with open(path, encoding="utf-8") as f:
+                for statement in statements(f.read()):
+                    cursor.execute(statement)
+            record(cursor, version, name)
+            conn.commit()
+            applied.append(version)
+        cursor.close()
+    return applied
+
+def baseline(version):
+    """Mark migrations up to `version` as applied without running them
+    (for databases where they were applied by hand before this tool existed)."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        done = applied_versions(cursor)
+        marked = []
+        for v, name, _ in available():
+            if v <= version and v not in done:
+                record(cursor, v, name)
+                marked.append(v)
+        conn.commit()
+        cursor.close()
+    return marked
+
+def status():
+    """[(version, name, applied?)] for every migration file."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        done = applied_versions(cursor)
+        conn.commit()
+        cursor.close()
+    return [(v, name, v in done) for v, name, _ in available()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="list migrations and whether each is applied")
+    up = sub.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", type=int, help="stop after this version")
+    bl = sub.add_parser("baseline", help="mark migrations up to VERSION as already applied")
+    bl.add_argument("version", type=int)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for version, name, is_applied in status():
+            print(f"{version:03d}_{name}: {'applied' if is_applied else 'pending'}")
+    elif args.command == "up":
+        versions = migrate(args.to)
+        print(f"Applied {len(versions)} migration(s).")
+    elif args.command == "baseline":
+        versions = baseline(args.version)
+        print(f"Marked {len(versions)} migration(s) as applied.")
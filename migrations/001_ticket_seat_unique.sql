@@ -0,0 +1,4 @@
+-- One ticket per seat per flight. purchase() relies on this to book a seat
+-- with a single INSERT instead of SELECT-then-INSERT.
+ALTER TABLE Ticket
+    ADD UNIQUE KEY uq_ticket_seat (airline_name, flight_number, departure_datetime, seat_number);
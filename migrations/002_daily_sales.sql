@@ -0,0 +1,15 @@
+-- Tickets sold per airline per day, kept up to date by booking.book_seats()
+-- so staff_reports() never has to scan Ticket. Rebuild with: python sales.py rebuild
+CREATE TABLE IF NOT EXISTS DailySales (
+    airline_name VARCHAR(50) NOT NULL,
+    sale_date    DATE        NOT NULL,
+    tickets      INT         NOT NULL DEFAULT 0,
+    PRIMARY KEY (airline_name, sale_date)
+);
+
+-- Backfill from existing tickets.
+INSERT INTO DailySales (airline_name, sale_date, tickets)
+SELECT airline_name, purchase_date, COUNT(*)
+FROM Ticket
+GROUP BY airline_name, purchase_date
+ON DUPLICATE KEY UPDATE tickets = VALUES(tickets);
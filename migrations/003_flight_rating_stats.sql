@@ -0,0 +1,32 @@
+-- Running rating totals per flight, kept up to date by rate_flight() so
+-- staff_ratings() doesn't aggregate FlightRating on every view.
+-- Rebuild with: python ratings.py rebuild
+CREATE TABLE IF NOT EXISTS FlightRatingStats (
+    airline_name       VARCHAR(50) NOT NULL,
+    flight_number      VARCHAR(20) NOT NULL,
+    departure_datetime DATETIME    NOT NULL,
+    num_ratings        INT NOT NULL DEFAULT 0,
+    rating_sum         INT NOT NULL DEFAULT 0,
+    stars_1            INT NOT NULL DEFAULT 0,
+    stars_2            INT NOT NULL DEFAULT 0,
+    stars_3            INT NOT NULL DEFAULT 0,
+    stars_4            INT NOT NULL DEFAULT 0,
+    stars_5            INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (airline_name, flight_number, departure_datetime)
+);
+
+-- Keyset pagination of reviews walks this index in customer_email order.
+CREATE INDEX idx_rating_flight_customer
+    ON FlightRating (airline_name, flight_number, departure_datetime, customer_email);
+
+INSERT INTO FlightRatingStats
+    (airline_name, flight_number, departure_datetime, num_ratings, rating_sum,
+     stars_1, stars_2, stars_3, stars_4, stars_5)
+SELECT airline_name, flight_number, departure_datetime, COUNT(*), SUM(rating),
+       SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+FROM FlightRating
+GROUP BY airline_name, flight_number, departure_datetime
+ON DUPLICATE KEY UPDATE
+    num_ratings = VALUES(num_ratings), rating_sum = VALUES(rating_sum),
+    stars_1 = VALUES(stars_1), stars_2 = VALUES(stars_2), stars_3 = VALUES(stars_3),
+    stars_4 = VALUES(stars_4), stars_5 = VALUES(stars_5);
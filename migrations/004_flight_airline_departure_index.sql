@@ -0,0 +1,4 @@
+-- staff_view_flights() pages through an airline's flights by
+-- (departure_datetime, flight_number) in both directions.
+CREATE INDEX idx_flight_airline_departure
+    ON Flight (airline_name, departure_datetime, flight_number);
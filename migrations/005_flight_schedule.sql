@@ -0,0 +1,20 @@
+-- Recurring flight patterns ("AA100 JFK->LAX daily at 08:00 from A to B").
+-- schedules.expand() turns them into concrete Flight rows up to a rolling
+-- horizon; expanded_through records how far each one has been generated.
+-- Expand from cron with: python schedules.py expand
+CREATE TABLE IF NOT EXISTS FlightSchedule (
+    schedule_id       INT AUTO_INCREMENT PRIMARY KEY,
+    airline_name      VARCHAR(50)   NOT NULL,
+    flight_number     VARCHAR(20)   NOT NULL,
+    departure_airport VARCHAR(10)   NOT NULL,
+    arrival_airport   VARCHAR(10)   NOT NULL,
+    departure_time    TIME          NOT NULL,
+    duration_minutes  INT           NOT NULL,
+    days_of_week      VARCHAR(7)    NOT NULL DEFAULT '1234567',  -- ISO weekdays, 1 = Monday
+    base_price        DECIMAL(10,2) NOT NULL,
+    airplane_id       VARCHAR(20)   NOT NULL,
+    start_date        DATE          NOT NULL,
+    end_date          DATE          NOT NULL,
+    expanded_through  DATE          NULL,
+    KEY idx_schedule_airline (airline_name, flight_number)
+);
@@ -0,0 +1,20 @@
+-- Composite indexes for the hot route queries; python explain_check.py
+-- verifies none of them falls back to a full table scan.
+-- FlightRating (airline_name, flight_number, departure_datetime) is already
+-- the prefix of idx_rating_flight_customer from 003.
+
+-- search_result(): one route on one day (or a flexible-date window).
+CREATE INDEX idx_flight_route_departure
+    ON Flight (departure_airport, arrival_airport, departure_datetime);
+
+-- route graph rebuild: every upcoming flight in the horizon, any airline.
+CREATE INDEX idx_flight_departure
+    ON Flight (departure_datetime);
+
+-- my_flights(), rate_past_flights(), rate_flight(): a customer's tickets.
+CREATE INDEX idx_ticket_customer_departure
+    ON Ticket (customer_email, departure_datetime);
+
+-- sales.py rebuild and purchase-date reporting per airline.
+CREATE INDEX idx_ticket_airline_purchase
+    ON Ticket (airline_name, purchase_date);
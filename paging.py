@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime
+
+#keyset ("seek") pagination helpers: a page token is the sort key of the last
+#row shown, and the next page starts strictly after it
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ?page_size= value, clamped to 1..maximum."""
+    if value and str(value).isdigit() and int(value) > 0:
+        return min(int(value), maximum)
+    return default
+
+def encode_cursor(*values):
+    """Opaque URL-safe token for a row's sort key."""
+    raw = json.dumps([v.isoformat(sep=" ") if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token, types):
+    """Inverse of encode_cursor; returns None for a missing or malformed token.
+
+    `types` gives the expected type (or tuple of types) of each sort key
+    column; datetime values are parsed back from their ISO text.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+
+    decoded = []
+    for value, kind in zip(values, types):
+        if kind is datetime:
+            if not isinstance(value, str):
+                return None
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        elif isinstance(value, bool) or not isinstance(value, kind):
+            return None
+        decoded.append(value)
+    return decoded
+
+def seek_clause(columns, descending=False):
+    """WHERE fragment selecting rows after a cursor on `columns` (in sort order).
+
+    Expanded to ORs instead of a row comparison so MySQL can use the index range.
+    Parameters: the cursor values, with prefixes repeated, e.g. for (a, b):
+    (a > %s OR (a = %s AND b > %s)) -> [a, a, b].
+    """
+    op = "<" if descending else ">"
+    parts = []
+    for i, col in enumerate(columns):
+        eqs = [f"{c} = %s" for c in columns[:i]]
+        parts.append("(" + " AND ".join(eqs + [f"{col} {op} %s"]) + ")")
+    return "(" + " OR ".join(parts) + ")"
+
+def seek_params(values):
+    params = []
+    for i in range(len(values)):
+        params.extend(values[:i + 1])
+    return params
+
+def paginate(rows, size, key):
+    """Trim a LIMIT size+1 result to `size` rows and build the next-page token."""
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, encode_cursor(*key(rows[-1]))
+    return rows, None
@@ -0,0 +1,101 @@
+import argparse
+
+from db import db_connection
+
+#FlightRatingStats is created by migrations/003_flight_rating_stats.sql
+
+STARS = (1, 2, 3, 4, 5)
+REVIEWS_PAGE_SIZE = 20
+MAX_REVIEWS_PAGE_SIZE = 100
+
+def record_rating(cursor, airline, flight, departure, rating):
+    """Add one rating to FlightRatingStats on the caller's cursor (same transaction)."""
+    cursor.execute("""
+        INSERT INTO FlightRatingStats
+            (airline_name, flight_number, departure_datetime, num_ratings, rating_sum,
+             stars_1, stars_2, stars_3, stars_4, stars_5)
+        VALUES (%s, %s, %s, 1, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            num_ratings = num_ratings + 1,
+            rating_sum = rating_sum + VALUES(rating_sum),
+            stars_1 = stars_1 + VALUES(stars_1),
+            stars_2 = stars_2 + VALUES(stars_2),
+            stars_3 = stars_3 + VALUES(stars_3),
+            stars_4 = stars_4 + VALUES(stars_4),
+            stars_5 = stars_5 + VALUES(stars_5)
+    """, (airline, flight, departure, rating) + tuple(int(rating == s) for s in STARS))
+
+def rating_summary(cursor, airline, flight, departure):
+    """Count, average and per-star histogram for one flight (a single-row lookup)."""
+    cursor.execute("""
+        SELECT num_ratings, rating_sum, stars_1, stars_2, stars_3, stars_4, stars_5
+        FROM FlightRatingStats
+        WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
+    """, (airline, flight, departure))
+    row = cursor.fetchone()
+    if isinstance(row, dict):
+        row = tuple(row.values())
+    count, total = (row[0], row[1]) if row else (0, 0)
+    return {
+        "count": count,
+        "avg_rating": round(total / count, 2) if count else None,
+        "histogram": {s: (row[1 + s] if row else 0) for s in STARS},
+    }
+
+def reviews_page(cursor, airline, flight, departure, after=None, limit=REVIEWS_PAGE_SIZE):
+    """One page of reviews ordered by customer_email, starting after `after`.
+
+    Returns (reviews, next_after); next_after is None on the last page.
+    """
+    params = [airline, flight, departure]
+    after_clause = ""
+    if after:
+        after_clause = "AND customer_email > %s"
+        params.append(after)
+    params.append(limit + 1)
+
+    cursor.execute(f"""
+        SELECT customer_email, rating, comment
+        FROM FlightRating
+        WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
+          {after_clause}
+        ORDER BY customer_email
+        LIMIT %s
+    """, tuple(params))
+    rows = cursor.fetchall()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, last["customer_email"] if isinstance(last, dict) else last[0]
+    return rows, None
+
+def rebuild():
+    """Recompute FlightRatingStats from FlightRating."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM FlightRatingStats")
+        cursor.execute("""
+            INSERT INTO FlightRatingStats
+                (airline_name, flight_number, departure_datetime, num_ratings, rating_sum,
+                 stars_1, stars_2, stars_3, stars_4, stars_5)
+            SELECT airline_name, flight_number, departure_datetime, COUNT(*), SUM(rating),
+                   SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+            FROM FlightRating
+            GROUP BY airline_name, flight_number, departure_datetime
+        """)
+        rows = cursor.rowcount
+        conn.commit()
+        cursor.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the FlightRatingStats aggregates.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="recompute FlightRatingStats from FlightRating")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        n = rebuild()
+        print(f"Rebuilt {n} FlightRatingStats rows.")
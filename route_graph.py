@@ -0,0 +1,274 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from db import db_connection
+
+#connection rules
+MIN_CONNECTION = timedelta(minutes=45)
+MAX_CONNECTION = timedelta(hours=12)
+MAX_STOPS = 2
+
+HORIZON_DAYS = 90            # only upcoming flights this far out are in the graph
+REBUILD_INTERVAL = 3600      # seconds; full reload as the horizon moves forward
+
+FLIGHT_COLUMNS = """
+    airline_name, flight_number, departure_airport, arrival_airport,
+    departure_datetime, arrival_datetime, base_price, status
+"""
+
+
+class RouteGraph:
+    """Upcoming flights indexed by departure airport, sorted by departure time.
+
+    Each airport keeps two parallel lists (departure times and flight rows) so
+    "flights leaving X between t1 and t2" is a bisect plus a slice. The same
+    index per (from, to) pair lets the final hop go straight to the destination.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._times = {}     # airport -> [departure_datetime, ...]
+        self._flights = {}   # airport -> [flight row, ...] in the same order
+        self._keys = {}      # (airline, flight, departure) -> departure airport
+        self._route_times = {}     # (from, to) -> [departure_datetime, ...]
+        self._route_flights = {}   # (from, to) -> [flight row, ...]
+        self.built_at = 0.0
+        self.size = 0
+
+    @staticmethod
+    def _key(flight):
+        return (flight["airline_name"], str(flight["flight_number"]), str(flight["departure_datetime"]))
+
+    def _sort_key(self, flight):
+        return (flight["departure_datetime"], self._key(flight))
+
+    def load(self, flights):
+        """Replace the whole graph with `flights` (dict rows)."""
+        by_airport = {}
+        keys = {}
+        for f in flights:
+            if f.get("status") == "Cancelled":
+                continue
+            by_airport.setdefault(f["departure_airport"], []).append(f)
+            keys[self._key(f)] = f["departure_airport"]
+
+        times, rows = {}, {}
+        route_times, route_rows = {}, {}
+        for airport, legs in by_airport.items():
+            legs.sort(key=self._sort_key)
+            rows[airport] = legs
+            times[airport] = [f["departure_datetime"] for f in legs]
+            for f in legs:
+                route = (airport, f["arrival_airport"])
+                route_rows.setdefault(route, []).append(f)
+                route_times.setdefault(route, []).append(f["departure_datetime"])
+
+        with self._lock:
+            self._times, self._flights, self._keys = times, rows, keys
+            self._route_times, self._route_flights = route_times, route_rows
+            self.size = len(keys)
+            self.built_at = time.monotonic()
+
+    def _remove_locked(self, key):
+        airport = self._keys.pop(key, None)
+        if airport is None:
+            return
+        legs = self._flights[airport]
+        for i, f in enumerate(legs):
+            if self._key(f) == key:
+                del legs[i]
+                del self._times[airport][i]
+                route = (airport, f["arrival_airport"])
+                route_legs = self._route_flights[route]
+                j = route_legs.index(f)
+                del route_legs[j]
+                del self._route_times[route][j]
+                break
+        self.size -= 1
+
+    @staticmethod
+    def _insert(times, rows, flight):
+        i = bisect_left(times, flight["departure_datetime"])
+        rows.insert(i, flight)
+        times.insert(i, flight["departure_datetime"])
+
+    def invalidate(self):
+        """Mark the graph stale so the next search rebuilds it from Flight."""
+        self.built_at = 0.0
+
+    def upsert(self, flight):
+        """Add or replace one flight; cancelled flights are dropped."""
+        key = self._key(flight)
+        with self._lock:
+            self._remove_locked(key)
+            if flight.get("status") == "Cancelled":
+                return
+            airport = flight["departure_airport"]
+            route = (airport, flight["arrival_airport"])
+            self._insert(self._times.setdefault(airport, []),
+                         self._flights.setdefault(airport, []), flight)
+            self._insert(self._route_times.setdefault(route, []),
+                         self._route_flights.setdefault(route, []), flight)
+            self._keys[key] = airport
+            self.size += 1
+
+    def remove(self, airline, flight, departure):
+        with self._lock:
+            self._remove_locked((airline, str(flight), str(departure)))
+
+    def departures(self, airport, start, end, to=None):
+        """Flights leaving `airport` (for `to`, if given) with start <= departure < end."""
+        if to is None:
+            times, rows = self._times.get(airport), self._flights.get(airport)
+        else:
+            times, rows = self._route_times.get((airport, to)), self._route_flights.get((airport, to))
+        if not times:
+            return []
+        lo = bisect_left(times, start)
+        hi = bisect_left(times, end, lo)
+        return rows[lo:hi]
+
+    def search(self, source, destination, day, max_stops=MAX_STOPS,
+               min_connection=MIN_CONNECTION, max_connection=MAX_CONNECTION,
+               not_before=None, limit=50):
+        """Itineraries from source to destination leaving on `day` with up to max_stops.
+
+        Returns a list of {"legs", "stops", "departure", "arrival", "total_price"}
+        sorted by arrival time, then price.
+        """
+        if isinstance(day, str):
+            day = datetime.strptime(day[:10], "%Y-%m-%d")
+        start = datetime(day.year, day.month, day.day)
+        if not_before and not_before > start:
+            start = not_before
+        end = datetime(day.year, day.month, day.day) + timedelta(days=1)
+
+        results = []
+
+        def extend(path, visited):
+            last = path[-1]
+            if last["arrival_airport"] == destination:
+                results.append(path)
+                return
+            if len(path) > max_stops:
+                return
+            arrive = last["arrival_datetime"]
+            # the last allowed hop must land at the destination
+            to = destination if len(path) == max_stops else None
+            for nxt in self.departures(last["arrival_airport"],
+                                       arrive + min_connection,
+                                       arrive + max_connection, to):
+                if nxt["arrival_airport"] in visited:
+                    continue
+                visited.add(nxt["arrival_airport"])
+                extend(path + [nxt], visited)
+                visited.discard(nxt["arrival_airport"])
+
+        with self._lock:
+            for first in self.departures(source, start, end):
+                if first["arrival_airport"] == source:
+                    continue
+                extend([first], {source, first["arrival_airport"]})
+
+        itineraries = [{
+            "legs": legs,
+            "stops": len(legs) - 1,
+            "departure": legs[0]["departure_datetime"],
+            "arrival": legs[-1]["arrival_datetime"],
+            "total_price": sum(leg["base_price"] for leg in legs),
+        } for legs in results]
+        itineraries.sort(key=lambda it: (it["arrival"], it["total_price"], it["stops"]))
+        return itineraries[:limit]
+
+
+def load_upcoming_flights(horizon_days=HORIZON_DAYS):
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT {FLIGHT_COLUMNS}
+            FROM Flight
+            WHERE departure_datetime >= NOW()
+              AND departure_datetime < DATE_ADD(NOW(), INTERVAL %s DAY)
+        """, (horizon_days,))
+        flights = cursor.fetchall()
+        cursor.close()
+    return flights
+
+
+route_graph = RouteGraph()
+_build_lock = threading.Lock()
+
+def get_route_graph():
+    """The shared graph, (re)built from Flight when empty or older than REBUILD_INTERVAL."""
+    if route_graph.built_at and time.monotonic() - route_graph.built_at < REBUILD_INTERVAL:
+        return route_graph
+    with _build_lock:
+        if not route_graph.built_at or time.monotonic() - route_graph.built_at >= REBUILD_INTERVAL:
+            route_graph.load(load_upcoming_flights())
+    return route_graph
+
+def find_connections(source, destination, day, max_stops=MAX_STOPS):
+    return get_route_graph().search(source, destination, day, max_stops=max_stops,
+                                    not_before=datetime.now())
+
+
+#benchmark: python route_graph.py
+def synthetic_flights(num_airports, num_flights, days=7, seed=1):
+    rng = random.Random(seed)
+    airports = [f"A{i:03d}" for i in range(num_airports)]
+    base = datetime(2030, 1, 1)
+    flights = []
+    for n in range(num_flights):
+        src, dst = rng.sample(airports, 2)
+        dep = base + timedelta(minutes=rng.randrange(days * 24 * 60))
+        flights.append({
+            "airline_name": "Bench Air",
+            "flight_number": str(n),
+            "departure_airport": src,
+            "arrival_airport": dst,
+            "departure_datetime": dep,
+            "arrival_datetime": dep + timedelta(minutes=rng.randrange(60, 480)),
+            "base_price": rng.randrange(50, 800),
+            "status": "On-Time",
+        })
+    return airports, flights
+
+def benchmark(sizes=((50, 5000), (100, 20000), (200, 100000)), searches=200, seed=1):
+    """Time searches against synthetic graphs; returns one dict per graph size."""
+    rng = random.Random(seed)
+    report = []
+    for num_airports, num_flights in sizes:
+        airports, flights = synthetic_flights(num_airports, num_flights, seed=seed)
+        graph = RouteGraph()
+        t0 = time.perf_counter()
+        graph.load(flights)
+        build = time.perf_counter() - t0
+
+        latencies = []
+        found = 0
+        for _ in range(searches):
+            src, dst = rng.sample(airports, 2)
+            day = datetime(2030, 1, 1) + timedelta(days=rng.randrange(5))
+            t0 = time.perf_counter()
+            found += len(graph.search(src, dst, day))
+            latencies.append(time.perf_counter() - t0)
+
+        latencies.sort()
+        report.append({
+            "airports": num_airports,
+            "flights": num_flights,
+            "build_ms": round(build * 1000, 2),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "avg_itineraries": round(found / searches, 1),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,93 @@
+import argparse
+from collections import Counter, OrderedDict
+
+from db import db_connection
+
+#DailySales is created by migrations/002_daily_sales.sql
+
+def record_sales(cursor, airlines, sale_date):
+    """Add tickets bought on `sale_date` to DailySales, one count per entry in `airlines`.
+
+    Runs on the caller's cursor so it commits or rolls back with the tickets;
+    pass the purchase_date the Ticket rows got so the two always agree.
+    """
+    counts = Counter(airlines)
+    cursor.execute(
+        """
+        INSERT INTO DailySales (airline_name, sale_date, tickets)
+        VALUES {}
+        ON DUPLICATE KEY UPDATE tickets = tickets + VALUES(tickets)
+        """.format(", ".join(["(%s, %s, %s)"] * len(counts))),
+        tuple(value for airline, n in sorted(counts.items()) for value in (airline, sale_date, n))
+    )
+
+def sales_report(airline, start_date, end_date):
+    """Total tickets and per-month breakdown for purchase dates in [start, end]."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT sale_date, tickets
+            FROM DailySales
+            WHERE airline_name=%s AND sale_date BETWEEN %s AND %s
+            ORDER BY sale_date
+        """, (airline, start_date, end_date))
+        days = cursor.fetchall()
+        cursor.close()
+
+    monthly = OrderedDict()
+    for sale_date, tickets in days:
+        month = sale_date.strftime("%Y-%m")
+        monthly[month] = monthly.get(month, 0) + tickets
+
+    total = {"total_tickets": sum(monthly.values())}
+    return total, [{"month": m, "sold": n} for m, n in monthly.items()]
+
+def _date_range(date_column, start_date, end_date, airline):
+    """WHERE clause and params limiting `date_column` (and airline_name) to the range."""
+    conditions = []
+    params = []
+    if airline:
+        conditions.append("airline_name = %s")
+        params.append(airline)
+    if start_date:
+        conditions.append(f"{date_column} >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{date_column} <= %s")
+        params.append(end_date)
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    return where, tuple(params)
+
+def rebuild(start_date=None, end_date=None, airline=None):
+    """Recompute DailySales from Ticket, optionally limited to a date range/airline."""
+    sales_where, sales_params = _date_range("sale_date", start_date, end_date, airline)
+    ticket_where, ticket_params = _date_range("purchase_date", start_date, end_date, airline)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM DailySales " + sales_where, sales_params)
+        cursor.execute(f"""
+            INSERT INTO DailySales (airline_name, sale_date, tickets)
+            SELECT airline_name, purchase_date, COUNT(*)
+            FROM Ticket
+            {ticket_where}
+            GROUP BY airline_name, purchase_date
+        """, ticket_params)
+        rows = cursor.rowcount
+        conn.commit()
+        cursor.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the DailySales rollup.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebuild", help="recompute DailySales from Ticket")
+    rb.add_argument("--start", help="first purchase date (YYYY-MM-DD)")
+    rb.add_argument("--end", help="last purchase date (YYYY-MM-DD)")
+    rb.add_argument("--airline")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        n = rebuild(args.start, args.end, args.airline)
+        print(f"Rebuilt {n} DailySales rows.")
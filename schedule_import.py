@@ -0,0 +1,172 @@
+import argparse
+import csv
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from db import db_connection, insert_batches
+from cache import get_airports
+
+IMPORT_CHUNK_SIZE = 1000   # rows per executemany / transaction
+
+FLIGHT_CSV_COLUMNS = [
+    "flight_number", "departure_airport", "arrival_airport",
+    "departure_datetime", "arrival_datetime", "base_price", "airplane_id",
+]
+
+INSERT_FLIGHT = """
+    INSERT INTO Flight
+    (airline_name, flight_number, departure_airport, arrival_airport,
+     departure_datetime, arrival_datetime, base_price, airplane_id, status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M")
+
+def parse_datetime(value):
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"bad date/time '{value}'")
+
+def load_reference(cursor, airline):
+    """Airport codes and this airline's airplane ids, for in-memory validation."""
+    airports = {row["airport_code"] for row in get_airports()}
+    cursor.execute("SELECT airplane_id FROM Airplane WHERE airline_name=%s", (airline,))
+    airplanes = {str(row[0]) for row in cursor.fetchall()}
+    return airports, airplanes
+
+def validate_rows(reader, airline, airports, airplanes):
+    """Split CSV rows into (valid flight dicts, [(line, error)]).
+
+    Checks every row against Airport/Airplane sets in memory; nothing is
+    written here.
+    """
+    flights, errors, seen = [], [], set()
+
+    for line, raw in enumerate(reader, start=2):   # line 1 is the header
+        try:
+            values = {k: (raw.get(k) or "").strip() for k in FLIGHT_CSV_COLUMNS}
+            missing = [k for k, v in values.items() if not v]
+            if missing:
+                raise ValueError("missing " + ", ".join(missing))
+
+            dep = parse_datetime(values["departure_datetime"])
+            arr = parse_datetime(values["arrival_datetime"])
+            if arr <= dep:
+                raise ValueError("arrival must be after departure")
+            if values["departure_airport"] == values["arrival_airport"]:
+                raise ValueError("departure and arrival airports are the same")
+            for field in ("departure_airport", "arrival_airport"):
+                if values[field] not in airports:
+                    raise ValueError(f"unknown airport '{values[field]}'")
+            if values["airplane_id"] not in airplanes:
+                raise ValueError(f"unknown airplane '{values['airplane_id']}' for {airline}")
+            try:
+                price = Decimal(values["base_price"])
+            except InvalidOperation:
+                raise ValueError(f"bad price '{values['base_price']}'")
+            if price < 0:
+                raise ValueError("price must not be negative")
+
+            key = (values["flight_number"], dep)
+            if key in seen:
+                raise ValueError("duplicate flight in file")
+            seen.add(key)
+        except ValueError as err:
+            errors.append((line, str(err)))
+            continue
+
+        flights.append({
+            "line": line,
+            "airline_name": airline,
+            "flight_number": values["flight_number"],
+            "departure_airport": values["departure_airport"],
+            "arrival_airport": values["arrival_airport"],
+            "departure_datetime": dep,
+            "arrival_datetime": arr,
+            "base_price": price,
+            "airplane_id": values["airplane_id"],
+            "status": "On-Time",
+        })
+
+    return flights, errors
+
+def existing_keys(cursor, airline, flights):
+    """(flight_number, departure) pairs already in Flight within the file's date range."""
+    if not flights:
+        return set()
+    first = min(f["departure_datetime"] for f in flights)
+    last = max(f["departure_datetime"] for f in flights)
+    cursor.execute("""
+        SELECT flight_number, departure_datetime
+        FROM Flight
+        WHERE airline_name=%s AND departure_datetime BETWEEN %s AND %s
+    """, (airline, first, last))
+    return {(str(n), d) for n, d in cursor.fetchall()}
+
+def flight_params(f):
+    return (f["airline_name"], f["flight_number"], f["departure_airport"], f["arrival_airport"],
+            f["departure_datetime"], f["arrival_datetime"], f["base_price"], f["airplane_id"],
+            f["status"])
+
+def insert_flights(conn, flights, chunk_size=IMPORT_CHUNK_SIZE):
+    """Batched insert; returns (inserted rows, [(line, error)])."""
+    inserted, failed = insert_batches(conn, INSERT_FLIGHT, flights, flight_params, chunk_size)
+    return inserted, [(f["line"], message) for f, message in failed]
+
+def import_schedule(airline, text_stream, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and bulk-insert a flight CSV for `airline`.
+
+    Returns {"inserted": [flight dicts], "errors": [(line, message)], "rows", "seconds"}.
+    """
+    started = time.perf_counter()
+    reader = csv.DictReader(text_stream)
+    missing = [c for c in FLIGHT_CSV_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        return {"inserted": [], "errors": [(1, "missing columns: " + ", ".join(missing))],
+                "rows": 0, "seconds": 0.0}
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        airports, airplanes = load_reference(cursor, airline)
+        flights, errors = validate_rows(reader, airline, airports, airplanes)
+        total_rows = len(flights) + len(errors)
+
+        taken = existing_keys(cursor, airline, flights)
+        cursor.close()
+        new_flights = []
+        for f in flights:
+            if (f["flight_number"], f["departure_datetime"]) in taken:
+                errors.append((f["line"], "flight already exists"))
+            else:
+                new_flights.append(f)
+
+        inserted, insert_errors = insert_flights(conn, new_flights, chunk_size)
+        errors.extend(insert_errors)
+
+    errors.sort()
+    return {
+        "inserted": inserted,
+        "errors": errors,
+        "rows": total_rows,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import a flight schedule CSV.")
+    parser.add_argument("airline")
+    parser.add_argument("csv_file")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with open(args.csv_file, newline="", encoding="utf-8") as f:
+        result = import_schedule(args.airline, f, args.chunk_size)
+
+    for line, message in result["errors"]:
+        print(f"line {line}: {message}")
+    print(f"Inserted {len(result['inserted'])} of {result['rows']} flights "
+          f"in {result['seconds']:.1f}s ({len(result['errors'])} errors).")
@@ -0,0 +1,258 @@
+import argparse
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector
+
+from db import db_connection
+from schedule_import import existing_keys, flight_params, INSERT_FLIGHT, IMPORT_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+#FlightSchedule is created by migrations/005_flight_schedule.sql
+
+HORIZON_DAYS = 90        # flights are generated this far ahead of today
+EXPAND_INTERVAL = 3600   # seconds between background expansions in the web app
+EXPAND_RETRY = 60        # first retry after a failed expansion
+
+def parse_schedule(form, airports, airplanes):
+    """FlightSchedule column values from the create-schedule form.
+
+    Checked like schedule_import.validate_rows: airports and airplane against
+    in-memory sets, so a bad schedule is refused instead of expanding to nothing.
+    Raises ValueError with a message for the staff member.
+    """
+    values = {k: (form.get(k) or "").strip() for k in (
+        "flight_number", "departure_airport", "arrival_airport", "departure_time",
+        "duration", "base_price", "airplane_id", "start_date", "end_date")}
+    missing = [k for k, v in values.items() if not v]
+    if missing:
+        raise ValueError("Missing " + ", ".join(missing) + ".")
+
+    days = "".join(sorted({d for d in form.getlist("days") if d in "1234567" and len(d) == 1}))
+    if not days:
+        raise ValueError("Pick at least one day of the week.")
+    if values["departure_airport"] == values["arrival_airport"]:
+        raise ValueError("Departure and arrival airports are the same.")
+    for field in ("departure_airport", "arrival_airport"):
+        if values[field] not in airports:
+            raise ValueError(f"Unknown airport '{values[field]}'.")
+    if values["airplane_id"] not in airplanes:
+        raise ValueError(f"Unknown airplane '{values['airplane_id']}'.")
+
+    try:
+        departure_time = datetime.strptime(values["departure_time"][:5], "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Bad departure time '{values['departure_time']}'.")
+    hours, _, minutes = values["duration"].partition(":")
+    if not (hours.isdigit() and minutes.isdigit() and int(minutes) < 60):
+        raise ValueError(f"Bad duration '{values['duration']}', expected H:MM.")
+    duration = int(hours) * 60 + int(minutes)
+    if duration <= 0:
+        raise ValueError("Duration must be positive.")
+    try:
+        price = Decimal(values["base_price"])
+    except InvalidOperation:
+        raise ValueError(f"Bad price '{values['base_price']}'.")
+    if price < 0:
+        raise ValueError("Price must not be negative.")
+    try:
+        start = datetime.strptime(values["start_date"], "%Y-%m-%d").date()
+        end = datetime.strptime(values["end_date"], "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Dates must be YYYY-MM-DD.")
+    if end < start:
+        raise ValueError("End date is before start date.")
+
+    return {
+        "flight_number": values["flight_number"],
+        "departure_airport": values["departure_airport"],
+        "arrival_airport": values["arrival_airport"],
+        "departure_time": departure_time,
+        "duration_minutes": duration,
+        "days_of_week": days,
+        "base_price": price,
+        "airplane_id": values["airplane_id"],
+        "start_date": start,
+        "end_date": end,
+    }
+
+def departure_offset(value):
+    """FlightSchedule.departure_time as a timedelta (the connector returns TIME that way)."""
+    if isinstance(value, timedelta):
+        return value
+    return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second)
+
+def occurrences(schedule, first_day, last_day):
+    """Concrete Flight row dicts for `schedule` on its weekdays in [first_day, last_day]."""
+    offset = departure_offset(schedule["departure_time"])
+    duration = timedelta(minutes=schedule["duration_minutes"])
+    weekdays = {int(d) for d in schedule["days_of_week"]}
+
+    day = first_day
+    while day <= last_day:
+        if day.isoweekday() in weekdays:
+            dep = datetime.combine(day, datetime.min.time()) + offset
+            yield {
+                "airline_name": schedule["airline_name"],
+                "flight_number": str(schedule["flight_number"]),
+                "departure_airport": schedule["departure_airport"],
+                "arrival_airport": schedule["arrival_airport"],
+                "departure_datetime": dep,
+                "arrival_datetime": dep + duration,
+                "base_price": schedule["base_price"],
+                "airplane_id": schedule["airplane_id"],
+                "status": "On-Time",
+            }
+        day += timedelta(days=1)
+
+def _new_flights(cursor, flights):
+    """The flights not already in Flight (an earlier or concurrent expansion made them)."""
+    new = []
+    by_airline = {}
+    for f in flights:
+        by_airline.setdefault(f["airline_name"], []).append(f)
+    for airline, rows in by_airline.items():
+        taken = existing_keys(cursor, airline, rows)
+        new.extend(f for f in rows if (f["flight_number"], f["departure_datetime"]) not in taken)
+    return new
+
+def _insert(conn, items):
+    """Insert the occurrences of [(schedule_id, through, flights)] and advance their
+    expanded_through, all in one transaction. Returns the inserted flights."""
+    cursor = conn.cursor()
+    try:
+        new = _new_flights(cursor, [f for _, _, flights in items for f in flights])
+        if new:
+            cursor.executemany(INSERT_FLIGHT, [flight_params(f) for f in new])
+        cursor.executemany(
+            "UPDATE FlightSchedule SET expanded_through=%s WHERE schedule_id=%s",
+            [(through, schedule_id) for schedule_id, through, _ in items]
+        )
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return new
+
+def _flush(conn, items):
+    """Insert one batch; if it fails, retry schedule by schedule.
+
+    A schedule whose flights are rejected (unknown airport or airplane, or a
+    flight another expansion inserted meanwhile) keeps its expanded_through,
+    so it is retried on the next expansion. Returns the inserted flights.
+    """
+    try:
+        return _insert(conn, items)
+    except mysql.connector.Error:
+        pass
+
+    inserted = []
+    for item in items:
+        try:
+            inserted.extend(_insert(conn, [item]))
+        except mysql.connector.Error as err:
+            log.warning("schedule %s not expanded: %s", item[0], err.msg)
+    return inserted
+
+def expand(through=None, airline=None, schedule_id=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Generate Flight rows for every schedule up to `through` (default: the horizon).
+
+    Each schedule resumes from its expanded_through, so only the days the
+    horizon has moved past are generated. Returns the inserted flight dicts.
+    """
+    today = date.today()
+    through = through or today + timedelta(days=HORIZON_DAYS)
+
+    conditions = ["start_date <= %s", "(expanded_through IS NULL OR expanded_through < LEAST(end_date, %s))"]
+    params = [through, through]
+    if airline:
+        conditions.append("airline_name = %s")
+        params.append(airline)
+    if schedule_id:
+        conditions.append("schedule_id = %s")
+        params.append(schedule_id)
+
+    inserted = []
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT * FROM FlightSchedule WHERE " + " AND ".join(conditions) + " ORDER BY schedule_id",
+            tuple(params)
+        )
+        schedules = cursor.fetchall()
+        cursor.close()
+
+        batch, size = [], 0
+        for schedule in schedules:
+            first = schedule["start_date"]
+            if schedule["expanded_through"]:
+                first = max(first, schedule["expanded_through"] + timedelta(days=1))
+            first = max(first, today)
+            last = min(schedule["end_date"], through)
+
+            flights = list(occurrences(schedule, first, last))
+            batch.append((schedule["schedule_id"], last, flights))
+            size += len(flights)
+            if size >= chunk_size:
+                inserted.extend(_flush(conn, batch))
+                batch, size = [], 0
+
+        if batch:
+            inserted.extend(_flush(conn, batch))
+
+    return inserted
+
+_expander = None
+_expander_lock = threading.Lock()
+
+def start_expander(on_inserted, interval=EXPAND_INTERVAL):
+    """Expand all schedules in a daemon thread, now and every `interval` seconds.
+
+    Requests never wait on expansion. on_inserted(flights) is called with each
+    run's new flights; a failed run is logged and retried after EXPAND_RETRY,
+    doubling up to `interval`. Only the first call starts a thread.
+    """
+    global _expander
+    if _expander is not None:
+        return _expander
+    with _expander_lock:
+        if _expander is None:
+            _expander = threading.Thread(target=_expand_forever, args=(on_inserted, interval),
+                                         name="schedule-expander", daemon=True)
+            _expander.start()
+    return _expander
+
+def _expand_forever(on_inserted, interval):
+    retry = EXPAND_RETRY
+    while True:
+        try:
+            flights = expand()
+            if flights:
+                on_inserted(flights)
+        except Exception:
+            log.exception("Schedule expansion failed; retrying in %ds", retry)
+            time.sleep(retry)
+            retry = min(retry * 2, interval)
+            continue
+        retry = EXPAND_RETRY
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expand recurring FlightSchedule rows into flights.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ex = sub.add_parser("expand", help="generate flights up to the horizon")
+    ex.add_argument("--days", type=int, default=HORIZON_DAYS, help="horizon in days from today")
+    ex.add_argument("--airline")
+    args = parser.parse_args()
+
+    if args.command == "expand":
+        started = time.perf_counter()
+        flights = expand(date.today() + timedelta(days=args.days), args.airline)
+        print(f"Inserted {len(flights)} flights in {time.perf_counter() - started:.1f}s.")
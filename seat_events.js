@@ -0,0 +1,42 @@
+//keeps seat <select>s in step with sales while the page is open;
+//`selects` maps "AIRLINE|FLIGHT|YYYY-MM-DD HH:MM:SS" to that flight's <select>,
+//and all of them share one stream
+function watchSeats(url, selects) {
+    var flights = Object.keys(selects).filter(function (flight) {
+        return selects[flight];
+    });
+    if (!flights.length || !window.EventSource) {
+        return;
+    }
+    function remove(flight, seat) {
+        var select = selects[flight];
+        if (!select) {
+            return;
+        }
+        for (var i = 0; i < select.options.length; i++) {
+            if (select.options[i].value === seat) {
+                select.remove(i);
+                return;
+            }
+        }
+    }
+    var source = new EventSource(url + "?" + flights.map(function (flight) {
+        return "flight=" + encodeURIComponent(flight.replace(" ", "_"));
+    }).join("&"));
+    //full map on (re)connect: drop everything sold since the page rendered
+    source.addEventListener("map", function (e) {
+        var map = JSON.parse(e.data);
+        var perRow = map.letters.length;
+        for (var i = 0; i < map.bits.length; i++) {
+            if (map.bits.charAt(i) === "1") {
+                remove(map.flight, (Math.floor(i / perRow) + 1) + map.letters.charAt(i % perRow));
+            }
+        }
+    });
+    source.addEventListener("sold", function (e) {
+        var sold = JSON.parse(e.data);
+        sold.seats.forEach(function (seat) {
+            remove(sold.flight, seat);
+        });
+    });
+}
@@ -0,0 +1,113 @@
+import json
+import os
+import queue
+import threading
+
+from seats import seat_inventory
+
+#server-sent events for seat maps: every sale this process makes is pushed to
+#the streams watching that flight. Sales made by other worker processes only
+#show up when a client reconnects and gets a fresh map.
+#
+#an open stream holds a server thread for as long as the page is open, so the
+#app must run on a threaded server (the Flask dev server, gunicorn's gthread or
+#gevent workers), and SEAT_STREAMS, kept below the threads per process, caps
+#them so they can't take every thread from ordinary page requests. One stream
+#can watch several flights, so a round-trip page needs only one.
+
+KEEPALIVE_SECONDS = 15     # comment line sent on idle streams so proxies keep them open
+SUBSCRIBER_QUEUE = 100     # unsent events per stream before it is dropped as too slow
+RETRY_MS = 3000            # browser reconnect delay
+SEAT_STREAMS = int(os.environ.get("SEAT_STREAMS", 4))   # open streams per process; more get a 503
+MAX_STREAM_FLIGHTS = 4     # flights one stream may watch
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def flight_id(key):
+    """The "AIRLINE|FLIGHT|DEPARTURE" name a flight key has in events."""
+    return "|".join(key)
+
+
+class SeatBroker:
+    """In-process fan-out of seat sales to per-flight subscriber queues."""
+
+    def __init__(self):
+        self._subscribers = {}   # (airline, flight, departure) -> set of queues
+        self._streams = {}       # queue -> the keys it watches
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def subscribe(self, keys, max_streams=SEAT_STREAMS):
+        """A queue receiving sales on every flight in `keys`, or None with max_streams already open."""
+        q = queue.Queue(SUBSCRIBER_QUEUE)
+        with self._lock:
+            if len(self._streams) >= max_streams:
+                self.refused += 1
+                return None
+            self._streams[q] = keys
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            for key in self._streams.pop(q, ()):
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(q)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def is_subscribed(self, q):
+        with self._lock:
+            return q in self._streams
+
+    def publish(self, airline, flight, departure, seat):
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+        if not subscribers:
+            return
+        #encoded once, the same string goes to every stream
+        message = event("sold", {"flight": flight_id(key), "seats": [seat]})
+        self.published += 1
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                #its stream notices on its next event or keepalive and ends; the client reconnects
+                self.unsubscribe(q)
+                self.dropped += 1
+
+    def stream(self, q, maps):
+        """SSE text for one subscribed queue: each flight's map, then sales as they happen.
+
+        `maps` ({key: map}) must be read after subscribing so no sale falls
+        between the two.
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n" + "".join(
+                event("map", dict(payload, flight=flight_id(key))) for key, payload in maps.items())
+            while True:
+                try:
+                    message = q.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    message = ": keepalive\n\n"
+                if not self.is_subscribed(q):
+                    return
+                yield message
+        finally:
+            self.unsubscribe(q)
+
+    def stats(self):
+        with self._lock:
+            return {"flights": len(self._subscribers), "streams": len(self._streams),
+                    "published": self.published, "dropped": self.dropped, "refused": self.refused}
+
+
+seat_broker = SeatBroker()
+seat_inventory.add_listener(seat_broker.publish)
@@ -0,0 +1,320 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+import db
+from bench import git_commit, percentile
+
+#concurrent buyers racing for the same flight's seats through purchase() and
+#purchase_round(), against a seeded local database, e.g.
+#    python seat_loadtest.py --buyers 64 --attempts 20 --hot-seats 30 --output run.json
+#afterwards every seat is checked for double sales
+
+CARD = {"card_type": "credit", "card_number": "4000000000000000", "card_expiration": "2030-12-01"}
+
+
+def pick_flights(count=2):
+    """The upcoming flights with the most unsold seats: [{airline, flight, departure, num_seats}]."""
+    with db.db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT F.airline_name, F.flight_number, F.departure_datetime, A.num_seats,
+                   A.num_seats - (SELECT COUNT(*) FROM Ticket T
+                                  WHERE T.airline_name = F.airline_name
+                                    AND T.flight_number = F.flight_number
+                                    AND T.departure_datetime = F.departure_datetime) AS free
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.departure_datetime BETWEEN NOW() + INTERVAL 1 DAY AND NOW() + INTERVAL 30 DAY
+            ORDER BY free DESC
+            LIMIT %s
+        """, (count,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return [{"airline": r["airline_name"], "flight": str(r["flight_number"]),
+             "departure": str(r["departure_datetime"]), "num_seats": int(r["num_seats"])} for r in rows]
+
+def load_flight(spec):
+    """Parse an AIRLINE|FLIGHT|DEPARTURE argument and look up its seat count."""
+    airline, flight, departure = spec.split("|")
+    with db.db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT A.num_seats
+            FROM Flight F
+            JOIN Airplane A
+              ON F.airline_name = A.airline_name
+             AND F.airplane_id = A.airplane_id
+            WHERE F.airline_name=%s AND F.flight_number=%s AND F.departure_datetime=%s
+        """, (airline, flight, departure.replace("_", " ")))
+        row = cursor.fetchone()
+        cursor.close()
+    if not row:
+        raise SystemExit(f"Flight {spec} not found.")
+    return {"airline": airline, "flight": flight, "departure": departure.replace("_", " "),
+            "num_seats": int(row["num_seats"])}
+
+def load_customers(count):
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT email FROM Customer LIMIT %s", (count,))
+        emails = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    return emails
+
+def sold_seats(flight):
+    """{seat: tickets} for one flight."""
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT seat_number, COUNT(*)
+            FROM Ticket
+            WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
+            GROUP BY seat_number
+        """, (flight["airline"], flight["flight"], flight["departure"]))
+        seats = dict(cursor.fetchall())
+        cursor.close()
+    return seats
+
+
+def _buyer(client, email, plan, rng, attempts, tag, results):
+    """One buyer: `attempts` purchases of random seats from the hot set."""
+    from seats import seat_labels
+
+    onward, ret = plan["flights"][0], plan["flights"][-1]
+    on_seats = seat_labels(onward["num_seats"])[:plan["hot_seats"] or None]
+    ret_seats = seat_labels(ret["num_seats"])[:plan["hot_seats"] or None]
+
+    with client.session_transaction() as session:
+        session.update(username=email, role="customer")
+
+    for _ in range(attempts):
+        round_trip = len(plan["flights"]) > 1 and rng.random() < plan["round_share"]
+        if round_trip:
+            url = "/purchase_round"
+            data = dict(CARD, name_on_card=tag,
+                        on_airline=onward["airline"], on_flight=onward["flight"], on_dep=onward["departure"],
+                        ret_airline=ret["airline"], ret_flight=ret["flight"], ret_dep=ret["departure"],
+                        seat_onward=rng.choice(on_seats), seat_return=rng.choice(ret_seats))
+        else:
+            url = "/purchase/{}/{}/{}".format(onward["airline"], onward["flight"],
+                                              onward["departure"].replace(" ", "_"))
+            data = dict(CARD, name_on_card=tag, seat_number=rng.choice(on_seats))
+
+        started = time.perf_counter()
+        response = client.post(url, data=data)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+
+        if response.status_code == 200:
+            outcome = "booked"
+        elif response.status_code == 400:
+            outcome = "conflict"
+        elif response.status_code == 503:
+            #app.pool_timeout: no pooled connection freed up in time
+            outcome = "pool_timeout"
+        else:
+            outcome = "error"
+        results.append((elapsed, outcome, 2 if round_trip else 1))
+
+def run_buyers(plan, emails, seed):
+    """Run one thread per email in this process; returns [(seconds, outcome, legs)]."""
+    import app as webapp
+
+    #every buyer holds a connection for its whole request: a smaller pool would
+    #make the run measure pool waits (and time out) instead of seat contention
+    if db.get_pool().size < len(emails):
+        db.configure_pool(size=len(emails))
+
+    results = []
+    threads = [
+        threading.Thread(target=_buyer, args=(webapp.app.test_client(), email, plan,
+                                               random.Random(seed * 1000 + n), plan["attempts"],
+                                               plan["tag"], results))
+        for n, email in enumerate(emails)
+    ]
+    start_gate = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start_gate
+
+def _process_main(args):
+    plan, emails, seed, database = args
+    if database:
+        db.db_config["database"] = database
+    return run_buyers(plan, emails, seed)
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "count": len(latencies),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+    }
+
+def cleanup(tag, flights):
+    """Delete this run's tickets and recount today's DailySales for the airlines involved.
+
+    Also drops this process's seat maps and the flights' search keys (shared
+    with the app servers when SEARCH_BACKEND=sqlite); the servers'
+    own seat maps catch up within seats.SEATMAP_TTL.
+    """
+    import sales
+    from cache import search_cache
+    from itinerary import itinerary_cache
+    from seats import seat_inventory
+
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        deleted = 0
+        for f in flights:
+            cursor.execute("""
+                SELECT departure_airport, arrival_airport
+                FROM Flight
+                WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
+            """, (f["airline"], f["flight"], f["departure"]))
+            route = cursor.fetchone()
+            cursor.execute("""
+                DELETE FROM Ticket
+                WHERE airline_name=%s AND flight_number=%s AND departure_datetime=%s
+                  AND name_on_card=%s
+            """, (f["airline"], f["flight"], f["departure"], tag))
+            deleted += cursor.rowcount
+            conn.commit()
+            seat_inventory.invalidate(f["airline"], f["flight"], f["departure"])
+            itinerary_cache.invalidate_flight(f["airline"], f["flight"], f["departure"])
+            if route:
+                search_cache.invalidate(route[0], route[1], f["departure"][:10])
+        cursor.close()
+    today = date.today().isoformat()
+    for airline in {f["airline"] for f in flights}:
+        sales.rebuild(today, today, airline)
+    return deleted
+
+def run(buyers=32, attempts=20, processes=1, flights=None, hot_seats=0, round_share=0.0,
+        seed=1, database=None, remove=False, log=None):
+    flights = flights or pick_flights(2 if round_share else 1)
+    if not flights:
+        raise SystemExit("No upcoming flights found; seed the database first (python seed.py).")
+    emails = load_customers(buyers)
+    if not emails:
+        raise SystemExit("No customers found; seed the database first (python seed.py).")
+    emails = [emails[n % len(emails)] for n in range(buyers)]
+
+    tag = f"LOADTEST {uuid.uuid4().hex[:8]}"
+    plan = {"flights": flights, "hot_seats": hot_seats, "round_share": round_share,
+            "attempts": attempts, "tag": tag}
+    before = [sum(sold_seats(f).values()) for f in flights]
+
+    if log:
+        log(f"{buyers} buyers x {attempts} attempts on "
+            + ", ".join(f"{f['airline']} {f['flight']} {f['departure']}" for f in flights))
+
+    if processes > 1:
+        groups = [(plan, emails[i::processes], seed + i, database) for i in range(processes)]
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            parts = pool.map(_process_main, groups)
+        results = [r for part, _ in parts for r in part]
+        wall = max(seconds for _, seconds in parts)
+    else:
+        results, wall = run_buyers(plan, emails, seed)
+
+    after = [sold_seats(f) for f in flights]
+    double_sold = [
+        {"flight": f"{f['airline']}|{f['flight']}|{f['departure']}", "seat": seat, "tickets": n}
+        for f, seats in zip(flights, after) for seat, n in seats.items() if n > 1
+    ]
+    sold_delta = sum(sum(seats.values()) for seats in after) - sum(before)
+    booked_legs = sum(legs for _, outcome, legs in results if outcome == "booked")
+
+    booked = [s for s, outcome, _ in results if outcome == "booked"]
+    conflicts = [s for s, outcome, _ in results if outcome == "conflict"]
+    errors = [s for s, outcome, _ in results if outcome == "error"]
+    pool_timeouts = [s for s, outcome, _ in results if outcome == "pool_timeout"]
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "database": db.db_config.get("database"),
+            "buyers": buyers,
+            "attempts_per_buyer": attempts,
+            "processes": processes,
+            "hot_seats": hot_seats,
+            "round_share": round_share,
+            "seed": seed,
+            "flights": flights,
+            "tag": tag,
+        },
+        "results": {
+            "attempts": len(results),
+            "booked": len(booked),
+            "conflicts": len(conflicts),
+            "errors": len(errors),
+            "pool_timeouts": len(pool_timeouts),
+            "wall_seconds": round(wall, 3),
+            "bookings_per_second": round(len(booked) / wall, 1) if wall else None,
+            "conflict_rate": round(len(conflicts) / len(results), 4) if results else 0.0,
+            "latency": summarize([s for s, _, _ in results]),
+            "latency_booked": summarize(booked),
+            "latency_conflict": summarize(conflicts),
+        },
+        "verify": {
+            "double_sold": double_sold,
+            "tickets_added": sold_delta,
+            "booked_legs": booked_legs,
+            "ok": not double_sold and sold_delta == booked_legs,
+        },
+    }
+    if remove:
+        report["verify"]["cleaned_up"] = cleanup(tag, flights)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent seat-purchase load test.")
+    parser.add_argument("--buyers", type=int, default=32, help="concurrent buyers (threads)")
+    parser.add_argument("--attempts", type=int, default=20, help="purchases tried per buyer")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="spread buyers over this many processes (separate seat caches, like workers)")
+    parser.add_argument("--flight", action="append",
+                        help="AIRLINE|FLIGHT|YYYY-MM-DD_HH:MM:SS; give twice for round trips")
+    parser.add_argument("--hot-seats", type=int, default=0,
+                        help="only fight over the first N seats (0 = the whole cabin)")
+    parser.add_argument("--round-share", type=float, default=0.0,
+                        help="share of attempts that buy a round trip over two flights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="database to run against (default: db.db_config)")
+    parser.add_argument("--cleanup", action="store_true", help="delete this run's tickets afterwards (running app servers keep "
+                             "counting them as sold until their seat maps expire)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.database:
+        db.db_config["database"] = args.database
+    flights = [load_flight(spec) for spec in args.flight] if args.flight else None
+
+    report = run(args.buyers, args.attempts, args.processes, flights, args.hot_seats,
+                 args.round_share, args.seed, args.database, args.cleanup,
+                 log=lambda line: print(line, file=sys.stderr))
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(0 if report["verify"]["ok"] else 1)
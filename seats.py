@@ -0,0 +1,194 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+#seat NUMBERS
+SEAT_LETTERS = "ABCDEF"   # 6 seats per row: A–F
+
+SEATMAP_TTL = 30          # seconds before occupancy is re-read from Ticket
+MAX_CACHED_FLIGHTS = 5000
+
+
+@lru_cache(maxsize=None)
+def seat_labels(num_seats, per_row=6):
+    """Return tuple like ('1A','1B',...,'30F') for given num_seats, built once per size."""
+    return tuple(
+        sys.intern(f"{i // per_row + 1}{SEAT_LETTERS[i % per_row]}")
+        for i in range(num_seats)
+    )
+
+@lru_cache(maxsize=None)
+def seat_index(num_seats, per_row=6):
+    """Return {label: bit position} for given num_seats."""
+    return {label: i for i, label in enumerate(seat_labels(num_seats, per_row))}
+
+
+class SeatMap:
+    """Occupancy of one flight as an int bitmap: bit i set = seat i sold."""
+
+    def __init__(self, num_seats, per_row=6):
+        self.num_seats = num_seats
+        self.per_row = per_row
+        self.labels = seat_labels(num_seats, per_row)
+        self.index = seat_index(num_seats, per_row)
+        self.bits = 0
+        self.sold = 0
+        self.loaded_at = time.monotonic()
+
+    def is_valid(self, seat):
+        return seat in self.index
+
+    def is_free(self, seat):
+        i = self.index.get(seat)
+        return i is not None and not (self.bits >> i) & 1
+
+    def mark(self, seat):
+        i = self.index.get(seat)
+        if i is not None and not (self.bits >> i) & 1:
+            self.bits |= 1 << i
+            self.sold += 1
+
+    def remaining(self):
+        return self.num_seats - self.sold
+
+    def bitstring(self):
+        """Occupancy as '0'/'1' characters, one per seat in label order."""
+        return format(self.bits, f"0{self.num_seats}b")[::-1] if self.num_seats else ""
+
+    def available(self):
+        if not self.sold:
+            return list(self.labels)
+
+        labels = self.labels
+        free = ~self.bits & ((1 << self.num_seats) - 1)
+        seats = []
+        while free:
+            low = free & -free
+            seats.append(labels[low.bit_length() - 1])
+            free ^= low
+        return seats
+
+
+class SeatInventory:
+    """Per-flight SeatMaps, loaded from Ticket on first use and kept in sync on insert.
+
+    A set bit is trusted until the map is reloaded: the TTL bounds how long this
+    process can miss seats sold by another worker, or still count tickets that
+    were deleted (seat_loadtest --cleanup drops the maps in its own process).
+    """
+
+    def __init__(self, ttl=SEATMAP_TTL, max_flights=MAX_CACHED_FLIGHTS):
+        self.ttl = ttl
+        self.max_flights = max_flights
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []   # fn(airline, flight, departure, seat) on every sale
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def _load(self, conn, key, num_seats):
+        seat_map = SeatMap(num_seats)
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT seat_number
+            FROM Ticket
+            WHERE airline_name=%s
+              AND flight_number=%s
+              AND departure_datetime=%s
+        """, key)
+        for (seat,) in cur.fetchall():
+            seat_map.mark(seat)
+        cur.close()
+        return seat_map
+
+    def get(self, conn, airline, flight, departure, num_seats):
+        seat_map = self.cached(airline, flight, departure, num_seats)
+        if seat_map is None:
+            seat_map = self._load(conn, (airline, str(flight), str(departure)), num_seats)
+            self.store(airline, flight, departure, seat_map)
+        return seat_map
+
+    def cached(self, airline, flight, departure, num_seats):
+        """The flight's map if it is cached and fresh, else None (counted as a miss)."""
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            seat_map = self._maps.get(key)
+            if (seat_map is not None and seat_map.num_seats == num_seats
+                    and time.monotonic() - seat_map.loaded_at < self.ttl):
+                self._maps.move_to_end(key)
+                self.hits += 1
+                return seat_map
+            self.misses += 1
+            return None
+
+    def store(self, airline, flight, departure, seat_map):
+        """Cache a map loaded elsewhere (e.g. by the async API)."""
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            self._maps[key] = seat_map
+            self._maps.move_to_end(key)
+            while len(self._maps) > self.max_flights:
+                self._maps.popitem(last=False)
+
+    def mark_sold(self, airline, flight, departure, seat):
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            seat_map = self._maps.get(key)
+            if seat_map is not None:
+                seat_map.mark(seat)
+        for fn in self._listeners:
+            fn(airline, flight, departure, seat)
+
+    def sold_count(self, airline, flight, departure):
+        """Seats a fresh cached map has sold, else None; never queries or counts as a lookup."""
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            seat_map = self._maps.get(key)
+            if seat_map is None or time.monotonic() - seat_map.loaded_at >= self.ttl:
+                return None
+            return seat_map.sold
+
+    def known_sold(self, airline, flight, departure, seat):
+        """True if a cached map already has the seat sold; never queries."""
+        key = (airline, str(flight), str(departure))
+        with self._lock:
+            seat_map = self._maps.get(key)
+            return seat_map is not None and seat_map.is_valid(seat) and not seat_map.is_free(seat)
+
+    def invalidate(self, airline=None, flight=None, departure=None):
+        with self._lock:
+            if airline is None:
+                self._maps.clear()
+            else:
+                self._maps.pop((airline, str(flight), str(departure)), None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "flights": len(self._maps)}
+
+
+seat_inventory = SeatInventory()
+
+def with_availability(flights):
+    """Copies of search rows (which carry num_seats and seats_sold) with
+    seats_remaining, load_factor and sold_out added.
+
+    A fresh seat map that has counted more sales than the row was loaded
+    with is the better number. Expired maps are ignored, so tickets deleted
+    since (seat_loadtest --cleanup) stop counting within SEATMAP_TTL.
+    """
+    result = []
+    for f in flights:
+        num_seats = int(f["num_seats"])
+        live = seat_inventory.sold_count(f["airline_name"], f["flight_number"], f["departure_datetime"])
+        sold = max(int(f["seats_sold"]), live or 0)
+        remaining = max(num_seats - sold, 0)
+        result.append(dict(f, seats_remaining=remaining,
+                           load_factor=round(min(sold / num_seats, 1.0), 3) if num_seats else 1.0,
+                           sold_out=remaining == 0))
+    return result
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import db
+from seats import seat_labels
+
+#synthetic data for benchmarks: python seed.py --scale small
+#needs the project schema plus migrations (python migrate.py up); rows are
+#generated from a fixed seed relative to today and inserted with INSERT IGNORE,
+#so re-running the same scale on the same day adds nothing
+
+SCALES = {"small": 10_000, "medium": 100_000, "large": 1_000_000}   # tickets
+CHUNK_SIZE = 2000
+PASSWORD = "password"   # every seeded customer and staff account
+
+PAST_DAYS = 180         # flights span today - PAST_DAYS .. today + FUTURE_DAYS
+FUTURE_DAYS = 90
+RATED_SHARE = 0.3       # share of past tickets that get a rating
+
+MANUFACTURERS = ["Airbus", "Boeing", "Embraer", "Bombardier"]
+SEAT_COUNTS = [72, 120, 150, 180, 240, 300]
+CARD_TYPES = ["credit", "debit"]
+COMMENTS = ["", "", "Great flight", "On time", "Seat was cramped", "Friendly crew", "Delayed boarding"]
+
+
+def plan(tickets):
+    """Row counts for a target ticket count (about 60 tickets per flight)."""
+    flights = max(50, tickets // 60)
+    return {
+        "tickets": tickets,
+        "flights": flights,
+        "customers": max(100, tickets // 8),
+        "airlines": min(20, 3 + tickets // 50_000),
+        "airports": min(300, max(20, int(flights ** 0.5 * 2))),
+        "planes_per_airline": max(5, flights // 400),
+    }
+
+def insert_stream(conn, query, rows, chunk_size=CHUNK_SIZE):
+    """executemany over an iterator of rows, one transaction per chunk; returns rows sent."""
+    cursor = conn.cursor()
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        cursor.executemany(query, chunk)
+        conn.commit()
+        total += len(chunk)
+    cursor.close()
+    return total
+
+
+class Generator:
+    """Deterministic synthetic airline data for one scale."""
+
+    def __init__(self, counts, seed=1, today=None):
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.today = today or date.today()
+        self.password = hashlib.md5(PASSWORD.encode()).hexdigest()
+
+        self.airports = [f"Z{chr(65 + n // 26)}{chr(65 + n % 26)}" for n in range(counts["airports"])]
+        hubs = max(3, len(self.airports) // 10)
+        #hubs get most of the traffic, like real networks
+        self.airport_weights = [10 if i < hubs else 1 for i in range(len(self.airports))]
+        self.airlines = [f"Seed Air {n:02d}" for n in range(counts["airlines"])]
+        self.planes = {
+            airline: [(f"P{n:04d}", self.rng.choice(SEAT_COUNTS)) for n in range(counts["planes_per_airline"])]
+            for airline in self.airlines
+        }
+        self.customers = [f"customer{n}@example.com" for n in range(counts["customers"])]
+        self.flights = self._flights()
+
+    def airport_rows(self):
+        for code in self.airports:
+            yield (code, f"City {code}")
+
+    def airline_rows(self):
+        for airline in self.airlines:
+            yield (airline,)
+
+    def airplane_rows(self):
+        for airline, planes in self.planes.items():
+            for plane_id, seats in planes:
+                yield (airline, plane_id, seats, self.rng.choice(MANUFACTURERS), self.rng.randrange(1, 25))
+
+    def staff_rows(self):
+        for n, airline in enumerate(self.airlines):
+            yield (f"staff{n:02d}", self.password, "Seed", f"Staff{n:02d}", "1985-01-01",
+                   f"staff{n:02d}@example.com", airline)
+
+    def customer_rows(self):
+        for n, email in enumerate(self.customers):
+            yield (email, f"Customer {n}", self.password, str(n % 500 + 1), "Main St", "Springfield", "NY",
+                   f"555{n:07d}", f"PP{n:07d}", "2035-01-01", "USA", "1990-01-01")
+
+    def _flights(self):
+        """[(airline, number, dep_airport, arr_airport, departure, arrival, price, plane, seats)]"""
+        rng = self.rng
+        flights = []
+        first_day = self.today - timedelta(days=PAST_DAYS)
+        span = PAST_DAYS + FUTURE_DAYS
+        per_route = 30   # departures per route over the whole span
+        routes = max(1, self.counts["flights"] // per_route)
+
+        for r in range(routes):
+            airline = self.airlines[r % len(self.airlines)]
+            src, dst = rng.choices(self.airports, self.airport_weights, k=2)
+            while dst == src:
+                dst = rng.choice(self.airports)
+            plane_id, seats = rng.choice(self.planes[airline])
+            number = str(100 + r // len(self.airlines))
+            minutes = rng.randrange(5 * 60, 23 * 60, 5)
+            duration = timedelta(minutes=rng.randrange(60, 720, 5))
+            price = rng.randrange(80, 900)
+            for day in sorted(rng.sample(range(span), min(per_route, span))):
+                dep = datetime.combine(first_day + timedelta(days=day), datetime.min.time()) \
+                      + timedelta(minutes=minutes)
+                flights.append((airline, number, src, dst, dep, dep + duration, price, plane_id, seats))
+        return flights
+
+    def flight_rows(self):
+        for airline, number, src, dst, dep, arr, price, plane_id, _ in self.flights:
+            yield (airline, number, src, dst, dep, arr, price, plane_id, "On-Time")
+
+    def ticket_rows(self):
+        """Tickets per flight at a random load factor, with distinct seats.
+
+        Ratings for a share of the past tickets are collected into self.ratings
+        on the way, so the tickets themselves never have to be held in memory.
+        """
+        rng = self.rng
+        now = datetime.now()
+        per_flight = self.counts["tickets"] / len(self.flights)
+        self.ratings = []
+        for airline, number, _, _, dep, _, _, _, seats in self.flights:
+            load = min(seats, max(0, int(rng.gauss(per_flight, per_flight / 3))))
+            for seat in rng.sample(seat_labels(seats), load):
+                email = rng.choice(self.customers)
+                bought = dep.date() - timedelta(days=rng.randrange(1, 90))
+                if dep < now and rng.random() < RATED_SHARE:
+                    self.ratings.append((email, airline, number, dep,
+                                         rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 5, 4])[0],
+                                         rng.choice(COMMENTS)))
+                yield (email, airline, number, dep, seat, bought, rng.choice(CARD_TYPES),
+                       f"4{rng.randrange(10 ** 14, 10 ** 15)}", "2030-12-01", email.split("@")[0])
+
+
+def seed(tickets, seed_value=1, chunk_size=CHUNK_SIZE, log=print):
+    """Generate and insert one dataset; returns {table: rows sent}."""
+    import ratings
+    import sales
+
+    gen = Generator(plan(tickets), seed_value)
+    counts = {}
+    started = time.perf_counter()
+
+    with db.db_connection() as conn:
+        for table, query, rows in [
+            ("Airport", "INSERT IGNORE INTO Airport (airport_code, city) VALUES (%s, %s)",
+             gen.airport_rows()),
+            ("Airline", "INSERT IGNORE INTO Airline (airline_name) VALUES (%s)", gen.airline_rows()),
+            ("Airplane", "INSERT IGNORE INTO Airplane (airline_name, airplane_id, num_seats, manufacturer, age)"
+                         " VALUES (%s, %s, %s, %s, %s)", gen.airplane_rows()),
+            ("AirlineStaff", "INSERT IGNORE INTO AirlineStaff (username, password, first_name, last_name,"
+                             " date_of_birth, email, airline_name) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+             gen.staff_rows()),
+            ("Customer", "INSERT IGNORE INTO Customer (email, name, password, building_number, street, city,"
+                         " state, phone_number, passport_number, passport_expiration, passport_country,"
+                         " date_of_birth) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+             gen.customer_rows()),
+            ("Flight", "INSERT IGNORE INTO Flight (airline_name, flight_number, departure_airport,"
+                       " arrival_airport, departure_datetime, arrival_datetime, base_price, airplane_id,"
+                       " status) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", gen.flight_rows()),
+        ]:
+            counts[table] = insert_stream(conn, query, rows, chunk_size)
+            log(f"{table}: {counts[table]} rows ({time.perf_counter() - started:.1f}s)")
+
+        counts["Ticket"] = insert_stream(
+            conn,
+            "INSERT IGNORE INTO Ticket (customer_email, airline_name, flight_number, departure_datetime,"
+            " seat_number, purchase_date, card_type, card_number, card_expiration, name_on_card)"
+            " VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            gen.ticket_rows(), chunk_size)
+        log(f"Ticket: {counts['Ticket']} rows ({time.perf_counter() - started:.1f}s)")
+
+        counts["FlightRating"] = insert_stream(
+            conn,
+            "INSERT IGNORE INTO FlightRating (customer_email, airline_name, flight_number,"
+            " departure_datetime, rating, comment) VALUES (%s, %s, %s, %s, %s, %s)",
+            gen.ratings, chunk_size)
+        log(f"FlightRating: {counts['FlightRating']} rows ({time.perf_counter() - started:.1f}s)")
+
+    #the rollups are maintained on write by the app; rebuild them for bulk-loaded rows
+    counts["DailySales"] = sales.rebuild()
+    counts["FlightRatingStats"] = ratings.rebuild()
+    log(f"Rollups rebuilt ({time.perf_counter() - started:.1f}s)")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load synthetic benchmark data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--tickets", type=int, help="override the scale's ticket count")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="database to load into (default: db.db_config)")
+    parser.add_argument("--dry-run", action="store_true", help="print the planned row counts only")
+    args = parser.parse_args()
+
+    if args.database:
+        db.db_config["database"] = args.database
+    tickets = args.tickets or SCALES[args.scale]
+
+    if args.dry_run:
+        print(json.dumps(plan(tickets), indent=2))
+    else:
+        print(json.dumps(seed(tickets, args.seed), indent=2))
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+
+from db import add_statement_listener
+
+#per-request SQL instrumentation: every statement run on a pooled connection is
+#recorded (normalized text, duration, rows) against the current request
+
+SLOW_QUERY_SECONDS = 0.2     # statements slower than this go to the slow-query log
+SLOW_QUERY_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slow_queries.log")
+REPEAT_WARNING = 10          # same statement this often in one request looks like N+1
+
+slow_log = logging.getLogger("sql.slow")
+log = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_VALUES_LIST = re.compile(r"(\(\s*[^()]*%s[^()]*\))(?:\s*,\s*\(\s*[^()]*%s[^()]*\))+")
+
+def normalize(statement):
+    """One line of SQL with IN lists and multi-row VALUES collapsed, for grouping."""
+    text = " ".join(statement.split()).rstrip(";")
+    text = _IN_LIST.sub("(%s, ...)", text)
+    return _VALUES_LIST.sub(r"\1, ...", text)
+
+def write_slow(record, threshold, route=None):
+    slow_log.warning(json.dumps({
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "route": route,
+        "seconds": round(record["seconds"], 4),
+        "threshold": threshold,
+        "rows": record["rows"],
+        "statement": normalize(record["statement"]),
+    }))
+
+def init_app(app):
+    """Record statements per request, log slow ones, and add X-SQL-* headers in debug mode.
+
+    Config: SLOW_QUERY_SECONDS, SLOW_QUERY_LOG (None to leave logging to the
+    host), SQL_DEBUG_HEADERS (defaults to app.debug).
+    """
+    app.config.setdefault("SLOW_QUERY_SECONDS", SLOW_QUERY_SECONDS)
+    log_file = app.config.setdefault("SLOW_QUERY_LOG", SLOW_QUERY_LOG)
+    if log_file and not slow_log.handlers:
+        handler = logging.FileHandler(log_file, delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_log.addHandler(handler)
+        slow_log.setLevel(logging.WARNING)
+        slow_log.propagate = False
+
+    def listener(record):
+        if has_request_context() and "sql_queries" in g:
+            g.sql_queries.append(record)
+            return
+        threshold = app.config["SLOW_QUERY_SECONDS"]
+        if record["seconds"] >= threshold:
+            write_slow(record, threshold)   # CLI / background work: rows as known so far
+
+    add_statement_listener(listener)
+
+    @app.before_request
+    def start_sql_trace():
+        g.sql_queries = []
+
+    @app.after_request
+    def finish_sql_trace(response):
+        queries = g.get("sql_queries")
+        if queries is None:
+            return response
+        route = request.endpoint or request.path
+        total = sum(q["seconds"] for q in queries)
+
+        threshold = app.config["SLOW_QUERY_SECONDS"]
+        for q in queries:
+            if q["seconds"] >= threshold:
+                write_slow(q, threshold, route)
+
+        repeated = [(text, n) for text, n in Counter(normalize(q["statement"]) for q in queries).items()
+                    if n >= REPEAT_WARNING]
+        for text, n in repeated:
+            log.warning("%s ran %d times in one request (N+1?): %s", route, n, text[:200])
+
+        if app.config.get("SQL_DEBUG_HEADERS", app.debug):
+            response.headers["X-SQL-Queries"] = str(len(queries))
+            response.headers["X-SQL-Time-ms"] = f"{total * 1000:.1f}"
+            response.headers["X-SQL-Rows"] = str(sum(q["rows"] for q in queries))
+            if repeated:
+                response.headers["X-SQL-Repeated"] = str(max(n for _, n in repeated))
+        return response
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+import async_api
+from app import app as flask_app
+from cache import MemoryBackend, search_cache, set_search_backend
+from seats import seat_inventory
+
+#runs the async API against the embedded SQLite stand-in: python -m pytest test_async_api.py
+
+
+def day(value):
+    return value.strftime("%Y-%m-%d")
+
+
+class AsyncAPITest(unittest.TestCase):
+
+    def setUp(self):
+        set_search_backend(MemoryBackend())
+        seat_inventory.invalidate()
+        self.departure = (datetime.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def run_api(self, test):
+        async def main():
+            database = async_api.StandIn()
+            await database.open()
+            database.insert("Airplane", [{"airline_name": "X", "airplane_id": "P1", "num_seats": 12}])
+            database.insert("Flight", [{
+                "airline_name": "X", "flight_number": str(n), "departure_airport": "JFK",
+                "arrival_airport": "LAX", "departure_datetime": self.departure + timedelta(days=n),
+                "arrival_datetime": self.departure + timedelta(days=n, hours=5), "base_price": 100 + n,
+                "airplane_id": "P1", "status": "On-Time",
+            } for n in range(5)])
+            database.insert("Ticket", [{
+                "customer_email": "a@example.com", "airline_name": "X", "flight_number": "0",
+                "departure_datetime": self.departure, "seat_number": "1A", "card_type": "credit",
+            }])
+            try:
+                return await test(async_api.API(database))
+            finally:
+                await database.close()
+        return asyncio.run(main())
+
+    def test_search(self):
+        status, body = self.run_api(lambda api: api.dispatch(
+            "GET", f"/api/search?source=JFK&destination=LAX&departure_date={day(self.departure)}", {}))
+        self.assertEqual(status, 200)
+        [flight] = body["onward"]["flights"]
+        self.assertEqual(flight["flight_number"], "0")
+        self.assertEqual(flight["seats_remaining"], 11)
+
+    def test_search_rejects_bad_date(self):
+        status, _ = self.run_api(lambda api: api.dispatch(
+            "GET", "/api/search?source=JFK&destination=LAX&departure_date=tomorrow", {}))
+        self.assertEqual(status, 400)
+
+    def test_concurrent_windows_with_different_missing_days(self):
+        first, middle = self.departure, self.departure + timedelta(days=2)
+
+        async def test(api):
+            #the first caller only misses the days around a cached middle day...
+            search_cache.backend.set(search_cache.key("JFK", "LAX", day(middle)), [], 60)
+            partial = asyncio.ensure_future(api.flights_window("JFK", "LAX", first, 5, datetime.now()))
+            while not api._loads._pending and not partial.done():
+                await asyncio.sleep(0)
+            #...the second misses all five, and must not be handed the first one's load
+            search_cache.invalidate("JFK", "LAX", day(middle))
+            full = await api.flights_window("JFK", "LAX", first, 5, datetime.now())
+            await partial
+            return full
+
+        full = self.run_api(test)
+        self.assertEqual(len(full), 5)
+        self.assertEqual([f["flight_number"] for f in full[day(middle)]], ["2"])
+
+    def test_seats(self):
+        departure = self.departure.strftime("%Y-%m-%d_%H:%M:%S")
+
+        async def test(api):
+            return await asyncio.gather(*[api.dispatch("GET", f"/api/seats/X/0/{departure}", {})
+                                          for _ in range(50)])
+
+        for status, body in self.run_api(test):
+            self.assertEqual(status, 200)
+            self.assertEqual(body["seats_remaining"], 11)
+            self.assertNotIn("1A", body["available_seats"])
+
+    def test_unknown_flight(self):
+        status, _ = self.run_api(lambda api: api.dispatch("GET", "/api/seats/X/9/2030-01-01_00:00:00", {}))
+        self.assertEqual(status, 404)
+
+    def test_my_flights_needs_customer_session(self):
+        status, _ = self.run_api(lambda api: api.dispatch("GET", "/api/my_flights", {}))
+        self.assertEqual(status, 401)
+
+        serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        cookie = serializer.dumps({"username": "a@example.com", "role": "customer"})
+        status, body = self.run_api(lambda api: api.dispatch(
+            "GET", "/api/my_flights", {"cookie": f"session={cookie}"}))
+        self.assertEqual(status, 200)
+        self.assertEqual([t["seat_number"] for t in body["flights"]], ["1A"])
+
+
+if __name__ == "__main__":
+    unittest.main()
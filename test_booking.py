@@ -0,0 +1,144 @@
+import unittest
+from unittest import mock
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import booking
+from booking import SeatTakenError, book_seat, book_seats
+from seats import SeatMap, seat_inventory
+
+#booking against a fake connection that enforces the Ticket seat key: python -m pytest test_booking.py
+
+DEPARTURE = "2030-01-01 10:00:00"
+RETURN = "2030-01-08 10:00:00"
+CARD = ("credit", "4000000000000000", "2030-12-01", "A Customer")
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, statement, params=()):
+        if "INSERT INTO Ticket" in statement:
+            self.conn.insert_tickets(params)
+        elif "INSERT INTO DailySales" in statement:
+            self.conn.pending_sales.append(tuple(params))
+        elif "FROM Ticket" in statement:
+            asked = [tuple(params[i:i + 4]) for i in range(0, len(params), 4)]
+            self.rows = [seat for seat in asked if seat in self.conn.sold]
+        else:
+            raise AssertionError(f"unexpected statement: {statement}")
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Committed tickets as (airline, flight, departure, seat); one open transaction at a time."""
+
+    def __init__(self, sold=()):
+        self.sold = set(sold)
+        self.pending = []
+        self.pending_sales = []
+        self.sales = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def insert_tickets(self, params):
+        #10 values per row: email, airline, flight, departure, seat, purchase_date, card...
+        seats = [tuple(params[i + 1:i + 5]) for i in range(0, len(params), 10)]
+        if len(set(seats)) < len(seats) or any(seat in self.sold for seat in seats):
+            raise mysql.connector.IntegrityError(msg="Duplicate entry", errno=errorcode.ER_DUP_ENTRY)
+        self.pending.extend(seats)
+
+    def commit(self):
+        self.sold.update(self.pending)
+        self.sales.extend(self.pending_sales)
+        self.pending, self.pending_sales = [], []
+        self.commits += 1
+
+    def rollback(self):
+        self.pending, self.pending_sales = [], []
+
+
+class BookingTest(unittest.TestCase):
+
+    def setUp(self):
+        seat_inventory.invalidate()
+        self.addCleanup(seat_inventory.invalidate)
+        patcher = mock.patch.object(booking, "contention", booking.ContentionStats())
+        self.contention = patcher.start()
+        self.addCleanup(patcher.stop)
+        seat_inventory.store("X", "1", DEPARTURE, SeatMap(12))
+        seat_inventory.store("X", "2", RETURN, SeatMap(12))
+
+    def test_books_a_free_seat(self):
+        conn = FakeConnection()
+        book_seat(conn, "a@example.com", "X", "1", DEPARTURE, "1A", *CARD)
+        self.assertEqual(conn.sold, {("X", "1", DEPARTURE, "1A")})
+        self.assertEqual(len(conn.sales), 1)
+        self.assertTrue(seat_inventory.known_sold("X", "1", DEPARTURE, "1A"))
+        self.assertEqual(self.contention.stats()["booked"], 1)
+
+    def test_taken_seat_raises_and_marks_it_sold(self):
+        conn = FakeConnection(sold={("X", "1", DEPARTURE, "1A")})
+        with self.assertRaises(SeatTakenError) as caught:
+            book_seat(conn, "b@example.com", "X", "1", DEPARTURE, "1A", *CARD)
+        self.assertEqual((caught.exception.seat, caught.exception.leg), ("1A", 0))
+        self.assertEqual(conn.commits, 0)
+        self.assertEqual(conn.sales, [])
+        self.assertTrue(seat_inventory.known_sold("X", "1", DEPARTURE, "1A"))
+        stats = self.contention.stats()
+        self.assertEqual((stats["attempts"], stats["conflicts"]), (1, 1))
+
+    def test_other_integrity_errors_are_not_seat_conflicts(self):
+        conn = FakeConnection()
+
+        def bad_foreign_key(params):
+            raise mysql.connector.IntegrityError(msg="Cannot add or update a child row",
+                                                 errno=errorcode.ER_NO_REFERENCED_ROW_2)
+
+        conn.insert_tickets = bad_foreign_key
+        with self.assertRaises(mysql.connector.IntegrityError):
+            book_seat(conn, "a@example.com", "X", "1", DEPARTURE, "1A", *CARD)
+        self.assertEqual(self.contention.stats()["conflicts"], 0)
+
+    def test_round_trip_books_both_legs_in_one_commit(self):
+        conn = FakeConnection()
+        book_seats(conn, "a@example.com", [("X", "1", DEPARTURE, "1A"), ("X", "2", RETURN, "2B")], *CARD)
+        self.assertEqual(conn.sold, {("X", "1", DEPARTURE, "1A"), ("X", "2", RETURN, "2B")})
+        self.assertEqual(conn.commits, 1)
+        stats = self.contention.stats()
+        self.assertEqual((stats["attempts"], stats["booked"]), (1, 1))
+
+    def test_taken_return_seat_books_neither_leg(self):
+        conn = FakeConnection(sold={("X", "2", RETURN, "2B")})
+        with self.assertRaises(SeatTakenError) as caught:
+            book_seats(conn, "a@example.com", [("X", "1", DEPARTURE, "1A"), ("X", "2", RETURN, "2B")], *CARD)
+        self.assertEqual((caught.exception.flight, caught.exception.seat, caught.exception.leg), ("2", "2B", 1))
+        self.assertEqual(conn.sold, {("X", "2", RETURN, "2B")})
+        self.assertEqual(conn.sales, [])
+        self.assertFalse(seat_inventory.known_sold("X", "1", DEPARTURE, "1A"))
+        self.assertTrue(seat_inventory.known_sold("X", "2", RETURN, "2B"))
+        stats = self.contention.stats()
+        self.assertEqual((stats["attempts"], stats["conflicts"]), (1, 1))
+
+    def test_same_seat_twice_is_refused_without_marking_it_sold(self):
+        conn = FakeConnection()
+        with self.assertRaises(SeatTakenError) as caught:
+            book_seats(conn, "a@example.com", [("X", "1", DEPARTURE, "1A"), ("X", "1", DEPARTURE, "1A")], *CARD)
+        self.assertEqual(caught.exception.leg, 0)
+        self.assertEqual(conn.sold, set())
+        self.assertFalse(seat_inventory.known_sold("X", "1", DEPARTURE, "1A"))
+
+
+if __name__ == "__main__":
+    unittest.main()
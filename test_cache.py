@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+
+from cache import MemoryBackend, SQLiteBackend, SearchCache
+
+#search cache invalidation on both backends: python -m pytest test_cache.py
+
+ROWS = [{"flight_number": "1"}]
+
+
+class SearchCacheTest(unittest.TestCase):
+
+    def backend(self):
+        return MemoryBackend()
+
+    def setUp(self):
+        self.cache = SearchCache(self.backend())
+
+    def test_put_then_get(self):
+        self.cache.put("JFK", "LAX", "2030-01-01", ROWS, time.time())
+        self.assertEqual(self.cache.get("JFK", "LAX", "2030-01-01"), ROWS)
+        self.assertIsNone(self.cache.get("JFK", "LAX", "2030-01-02"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_invalidate_drops_only_its_route_and_day(self):
+        started = time.time()
+        self.cache.put("JFK", "LAX", "2030-01-01", ROWS, started)
+        self.cache.put("JFK", "LAX", "2030-01-02", ROWS, started)
+        self.cache.invalidate("JFK", "LAX", "2030-01-01 10:00:00")
+        self.assertIsNone(self.cache.get("JFK", "LAX", "2030-01-01"))
+        self.assertEqual(self.cache.get("JFK", "LAX", "2030-01-02"), ROWS)
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        started = time.time()
+        time.sleep(0.001)
+        self.cache.invalidate("JFK", "LAX", "2030-01-01")
+        #rows read before the flight changed would otherwise be cached for the TTL
+        self.cache.put("JFK", "LAX", "2030-01-01", ROWS, started)
+        self.assertIsNone(self.cache.get("JFK", "LAX", "2030-01-01"))
+
+    def test_get_or_load_loads_once(self):
+        loads = []
+        loader = lambda: loads.append(1) or ROWS
+        self.cache.get_or_load("JFK", "LAX", "2030-01-01", loader)
+        self.cache.get_or_load("JFK", "LAX", "2030-01-01", loader)
+        self.assertEqual(len(loads), 1)
+
+    def test_entries_expire(self):
+        self.cache.ttl = 0
+        self.cache.put("JFK", "LAX", "2030-01-01", ROWS, time.time())
+        time.sleep(0.001)
+        self.assertIsNone(self.cache.get("JFK", "LAX", "2030-01-01"))
+
+
+class SQLiteSearchCacheTest(SearchCacheTest):
+
+    def backend(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteBackend(os.path.join(directory.name, "search.sqlite3"))
+
+    def test_invalidation_reaches_another_process_cache(self):
+        #a second SearchCache on the same file stands in for another worker
+        other = SearchCache(SQLiteBackend(self.cache.backend.path))
+        self.cache.put("JFK", "LAX", "2030-01-01", ROWS, time.time())
+        self.assertEqual(other.get("JFK", "LAX", "2030-01-01"), ROWS)
+        other.invalidate("JFK", "LAX", "2030-01-01")
+        self.assertIsNone(self.cache.get("JFK", "LAX", "2030-01-01"))
+
+
+if __name__ == "__main__":
+    unittest.main()
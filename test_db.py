@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import mysql.connector
+
+import db
+
+#the connection pool against fake MySQL connections: python -m pytest test_db.py
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.in_transaction = False
+        self.healthy = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.healthy:
+            raise mysql.connector.errors.OperationalError("MySQL server has gone away")
+
+    def rollback(self):
+        if not self.healthy:
+            raise mysql.connector.errors.OperationalError("MySQL server has gone away")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.opened = []
+
+        def connect(**config):
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        patcher = mock.patch.object(mysql.connector, "connect", connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self, **settings):
+        return db.ConnectionPool(**dict({"size": 2, "timeout": 0.05}, **settings))
+
+    def test_released_connections_are_reused(self):
+        pool = self.pool()
+        with pool.connection():
+            pass
+        with pool.connection():
+            pass
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_timeout_when_every_connection_is_busy(self):
+        pool = self.pool(size=1)
+        held = pool.acquire()
+        with self.assertRaises(db.PoolTimeoutError):
+            pool.acquire()
+        held.close()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_waiter_gets_the_released_connection(self):
+        pool = self.pool(size=1, timeout=2.0)
+        held = pool.acquire()
+        threading.Timer(0.05, held.close).start()
+        with pool.connection(timeout=2.0) as conn:
+            self.assertIs(conn._conn, self.opened[0])
+        self.assertEqual(pool.stats()["waits"], 1)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_idle_connection_failing_its_health_check_is_replaced(self):
+        pool = self.pool(health_check_interval=0.0)
+        with pool.connection():
+            pass
+        self.opened[0].healthy = False
+        time.sleep(0.001)
+        with pool.connection() as conn:
+            self.assertIs(conn._conn, self.opened[1])
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual(pool.stats()["discarded"], 1)
+        self.assertEqual(pool.stats()["open"], 1)
+
+    def test_open_transaction_is_rolled_back_on_release(self):
+        pool = self.pool()
+        with pool.connection():
+            self.opened[0].in_transaction = True
+        self.assertEqual(self.opened[0].rollbacks, 1)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_connection_that_cannot_roll_back_is_dropped(self):
+        pool = self.pool()
+        with pool.connection():
+            self.opened[0].in_transaction = True
+            self.opened[0].healthy = False
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual(pool.stats()["open"], 0)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_connect_failure_frees_its_slot(self):
+        pool = self.pool(size=1)
+        with mock.patch.object(mysql.connector, "connect",
+                               side_effect=mysql.connector.errors.InterfaceError("refused")):
+            with self.assertRaises(mysql.connector.Error):
+                pool.acquire()
+        self.assertEqual(pool.stats()["open"], 0)
+        with pool.connection():
+            pass
+
+    def test_returned_connection_cannot_be_used(self):
+        pool = self.pool()
+        conn = pool.acquire()
+        conn.close()
+        with self.assertRaises(mysql.connector.errors.PoolError):
+            conn.cursor()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from itinerary import ItineraryCache
+
+#the itinerary cache with a fake loader: python -m pytest test_itinerary.py
+
+
+def ticket(flight, departure):
+    return {"airline_name": "X", "flight_number": flight, "departure_datetime": departure}
+
+
+class ItineraryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tickets = {
+            "a@example.com": [ticket("1", "2030-01-01 10:00:00"), ticket("2", "2030-02-01 10:00:00")],
+            "b@example.com": [ticket("2", "2030-02-01 10:00:00")],
+        }
+        self.loads = []
+        self.cache = ItineraryCache(loader=self.load)
+
+    def load(self, email):
+        self.loads.append(email)
+        return self.tickets[email]
+
+    def test_customer_is_loaded_once(self):
+        self.cache.get("a@example.com")
+        self.cache.get("a@example.com")
+        self.assertEqual(self.loads, ["a@example.com"])
+
+    def test_split_by_departure(self):
+        upcoming, past = self.cache.split("a@example.com", "2030-01-15 00:00:00")
+        self.assertEqual([r["flight_number"] for r in upcoming], ["2"])
+        self.assertEqual([r["flight_number"] for r in past], ["1"])
+
+    def test_session_stamp_forces_a_reload(self):
+        self.cache.get("a@example.com")
+        self.cache.get("a@example.com", not_before=float("inf"))
+        self.assertEqual(len(self.loads), 2)
+
+    def test_invalidate_flight_drops_its_customers_only(self):
+        self.cache.get("a@example.com")
+        self.cache.get("b@example.com")
+        self.cache.invalidate_flight("X", 1, "2030-01-01 10:00:00")
+        self.cache.get("a@example.com")
+        self.cache.get("b@example.com")
+        self.assertEqual(self.loads, ["a@example.com", "b@example.com", "a@example.com"])
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_invalidate_customer_clears_the_flight_index(self):
+        self.cache.get("b@example.com")
+        self.cache.invalidate_customer("b@example.com")
+        self.assertEqual(self.cache.stats()["flights"], 0)
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        def load_then_buy(email):
+            #a purchase commits while this customer's tickets are being read
+            self.cache.invalidate_customer(email)
+            return self.load(email)
+
+        self.cache.loader = load_then_buy
+        self.cache.get("a@example.com")
+        self.cache.loader = self.load
+        self.cache.get("a@example.com")
+        self.assertEqual(len(self.loads), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
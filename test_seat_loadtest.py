@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+import app
+import db
+import seat_loadtest
+
+#the load test's outcome accounting, without a database: python -m pytest test_seat_loadtest.py
+
+
+def exhausted_pool(timeout=None):
+    raise db.PoolTimeoutError("No database connection available after 0.0s (pool size 1).")
+
+
+class RunBuyersTest(unittest.TestCase):
+
+    def setUp(self):
+        app.app.config["EXPAND_SCHEDULES"] = False
+        self.plan = {
+            "flights": [{"airline": "X", "flight": "1", "departure": "2030-01-01 10:00:00", "num_seats": 12}],
+            "hot_seats": 0, "round_share": 0.0, "attempts": 3, "tag": "LOADTEST test",
+        }
+
+    def tearDown(self):
+        db.configure_pool()
+
+    def test_pool_timeouts_are_their_own_outcome(self):
+        with mock.patch.object(app, "db_connection", exhausted_pool):
+            results, _ = seat_loadtest.run_buyers(self.plan, ["a@example.com", "b@example.com"], seed=1)
+        self.assertEqual(len(results), 6)
+        self.assertEqual({outcome for _, outcome, _ in results}, {"pool_timeout"})
+
+    def test_database_errors_are_errors(self):
+        def broken(timeout=None):
+            raise db.PoolError("Connection already returned to the pool.")
+
+        with mock.patch.object(app, "db_connection", broken):
+            results, _ = seat_loadtest.run_buyers(self.plan, ["a@example.com"], seed=1)
+        self.assertEqual({outcome for _, outcome, _ in results}, {"error"})
+
+    def test_pool_grows_to_the_buyer_count(self):
+        db.configure_pool(size=2)
+        emails = [f"{n}@example.com" for n in range(5)]
+        with mock.patch.object(app, "db_connection", exhausted_pool):
+            seat_loadtest.run_buyers(self.plan, emails, seed=1)
+        self.assertEqual(db.get_pool().size, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from seats import SeatInventory, SeatMap, seat_inventory, with_availability
+
+#seat map caching and invalidation: python -m pytest test_seats.py
+
+DEPARTURE = "2030-01-01 10:00:00"
+
+
+class FakeCursor:
+
+    def __init__(self, seats):
+        self.seats = seats
+
+    def execute(self, statement, params=()):
+        pass
+
+    def fetchall(self):
+        return [(seat,) for seat in self.seats]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Answers the Ticket query with `seats` and counts how often it was asked."""
+
+    def __init__(self, seats=()):
+        self.seats = list(seats)
+        self.queries = 0
+
+    def cursor(self):
+        self.queries += 1
+        return FakeCursor(self.seats)
+
+
+class SeatInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = SeatInventory()
+
+    def test_map_is_loaded_once(self):
+        conn = FakeConnection(["1A"])
+        self.inventory.get(conn, "X", 1, DEPARTURE, 12)
+        seat_map = self.inventory.get(conn, "X", "1", DEPARTURE, 12)
+        self.assertEqual(conn.queries, 1)
+        self.assertFalse(seat_map.is_free("1A"))
+        self.assertEqual((self.inventory.hits, self.inventory.misses), (1, 1))
+
+    def test_invalidate_drops_only_its_flight(self):
+        conn = FakeConnection()
+        self.inventory.get(conn, "X", "1", DEPARTURE, 12)
+        self.inventory.get(conn, "X", "2", DEPARTURE, 12)
+        self.inventory.invalidate("X", "1", DEPARTURE)
+        self.assertIsNone(self.inventory.cached("X", "1", DEPARTURE, 12))
+        self.assertIsNotNone(self.inventory.cached("X", "2", DEPARTURE, 12))
+        self.inventory.invalidate()
+        self.assertEqual(self.inventory.stats()["flights"], 0)
+
+    def test_mark_sold_updates_the_map_and_tells_listeners(self):
+        sales = []
+        self.inventory.add_listener(lambda *sale: sales.append(sale))
+        self.inventory.store("X", "1", DEPARTURE, SeatMap(12))
+        self.inventory.mark_sold("X", "1", DEPARTURE, "2B")
+        self.assertTrue(self.inventory.known_sold("X", "1", DEPARTURE, "2B"))
+        self.assertFalse(self.inventory.known_sold("X", "1", DEPARTURE, "2C"))
+        self.assertEqual(self.inventory.sold_count("X", "1", DEPARTURE), 1)
+        self.assertEqual(sales, [("X", "1", DEPARTURE, "2B")])
+
+    def test_expired_map_is_reloaded_and_not_counted(self):
+        self.inventory.ttl = 0
+        conn = FakeConnection(["1A"])
+        self.inventory.get(conn, "X", "1", DEPARTURE, 12)
+        #an expired map may still count tickets deleted since it was loaded
+        self.assertIsNone(self.inventory.sold_count("X", "1", DEPARTURE))
+        self.inventory.get(conn, "X", "1", DEPARTURE, 12)
+        self.assertEqual(conn.queries, 2)
+
+    def test_with_availability_prefers_the_larger_sold_count(self):
+        row = {"airline_name": "X", "flight_number": "1", "departure_datetime": DEPARTURE,
+               "num_seats": 12, "seats_sold": 2}
+        self.assertEqual(with_availability([row])[0]["seats_remaining"], 10)
+        self.addCleanup(seat_inventory.invalidate)
+        seat_map = SeatMap(12)
+        for seat in ("1A", "1B", "1C"):
+            seat_map.mark(seat)
+        seat_inventory.store("X", "1", DEPARTURE, seat_map)
+        self.assertEqual(with_availability([row])[0]["seats_remaining"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()